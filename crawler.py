@@ -0,0 +1,390 @@
+import argparse
+import base64
+import hashlib
+import heapq
+import itertools
+import json
+import math
+import os
+import re
+import time
+import logging
+from urllib.parse import urldefrag, urlparse
+from web_scraper import WebScraper
+
+
+class BloomFilter:
+    def __init__(self, capacity=100000, error_rate=0.001):
+        """
+        Initialize a fixed-size Bloom filter for URL deduplication.
+
+        Args:
+            capacity (int): Expected number of distinct items.
+            error_rate (float): Target false positive rate at full capacity.
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item):
+        # Double hashing: derive every probe position from two 64-bit hashes
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, item):
+        """
+        Add an item to the filter.
+        """
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def to_dict(self):
+        """
+        Serialize the filter for checkpointing.
+        """
+        return {
+            "capacity": self.capacity,
+            "error_rate": self.error_rate,
+            "bits": base64.b64encode(bytes(self.bits)).decode("ascii"),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Restore a filter produced by to_dict.
+        """
+        bloom = cls(capacity=data["capacity"], error_rate=data["error_rate"])
+        bloom.bits = bytearray(base64.b64decode(data["bits"]))
+        return bloom
+
+
+class Crawler:
+    def __init__(self,
+                 seeds,
+                 topic_keywords=None,
+                 web_scraper=None,
+                 local_index=None,
+                 max_pages=100,
+                 max_bytes=50_000_000,
+                 max_seconds=3600,
+                 max_depth=3,
+                 same_domain=False,
+                 checkpoint_path=None,
+                 checkpoint_every=10,
+                 fresh=False,
+                 depth_weight=1.0,
+                 domain_weight=0.5,
+                 relevance_weight=2.0):
+        """
+        Initialize a bounded, prioritized crawler.
+
+        Lower priority values are crawled first. A URL's priority grows with its
+        depth and with the number of pages already taken from its domain, and
+        shrinks with the relevance of its URL and parent page to the topic.
+
+        Args:
+            seeds (list): Start URLs.
+            topic_keywords (list): Keywords describing the topic area.
+            web_scraper (WebScraper): Scraper used for robots.txt, rate limits and extraction.
+            local_index (LocalIndex): Optional index every crawled page is added to.
+            max_pages (int): Page budget.
+            max_bytes (int): Budget of downloaded HTML bytes.
+            max_seconds (float): Wall-clock budget in seconds.
+            max_depth (int): Maximum link depth from the seeds.
+            same_domain (bool): Only follow links within the seed domains.
+            checkpoint_path (str): JSON file used to persist and resume the crawl.
+            checkpoint_every (int): Write a checkpoint after this many pages.
+            fresh (bool): Discard an existing checkpoint instead of resuming it.
+            depth_weight (float): Priority penalty per depth level.
+            domain_weight (float): Priority penalty per page already crawled on the domain.
+            relevance_weight (float): Priority bonus for a fully relevant URL.
+        """
+        self.seeds = list(seeds)
+        self.topic_terms = [kw.lower() for kw in (topic_keywords or []) if kw.strip()]
+        self.web_scraper = web_scraper or WebScraper(max_links=100)
+        self.local_index = local_index
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.max_depth = max_depth
+        self.same_domain = same_domain
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.depth_weight = depth_weight
+        self.domain_weight = domain_weight
+        self.relevance_weight = relevance_weight
+        self.seed_domains = {urlparse(url).netloc for url in self.seeds}
+
+        self.frontier = []
+        self.counter = itertools.count()
+        self.seen = BloomFilter(capacity=max(1000, max_pages * 100))
+        self.domain_counts = {}
+        self.pages_crawled = 0
+        self.bytes_fetched = 0
+
+        logging.basicConfig(level=logging.INFO,
+                            format="%(asctime)s - %(levelname)s - %(message)s")
+        self.logger = logging.getLogger("Crawler")
+
+        # Seeds already recorded in a resumed checkpoint are skipped by the seen-set.
+        # Finished crawls remove their checkpoint, so new seeds always get crawled.
+        if fresh:
+            self.remove_checkpoint()
+        self.load_checkpoint()
+        for url in self.seeds:
+            self.enqueue(url, depth=0, parent_relevance=1.0)
+
+    def relevance(self, text):
+        """
+        Score text by the fraction of topic terms it contains.
+
+        Returns:
+            float: Relevance between 0 and 1 (1 when no topic is set).
+        """
+        if not self.topic_terms:
+            return 1.0
+        text = text.lower()
+        return sum(term in text for term in self.topic_terms) / len(self.topic_terms)
+
+    def priority(self, url, depth, parent_relevance):
+        """
+        Compute the frontier priority of a URL (lower is crawled sooner).
+        """
+        domain = urlparse(url).netloc
+        url_relevance = self.relevance(re.sub(r"[\W_]+", " ", url))
+        relevance = max(url_relevance, parent_relevance * 0.5)
+        return (
+            depth * self.depth_weight
+            + self.domain_counts.get(domain, 0) * self.domain_weight
+            - relevance * self.relevance_weight
+        )
+
+    def enqueue(self, url, depth, parent_relevance):
+        """
+        Add a URL to the frontier unless it was seen before or is out of scope.
+        """
+        url = urldefrag(url)[0]
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or depth > self.max_depth:
+            return
+        if self.same_domain and parsed.netloc not in self.seed_domains:
+            return
+        if url in self.seen:
+            return
+        self.seen.add(url)
+        self.push(url, depth, parent_relevance)
+
+    def push(self, url, depth, parent_relevance):
+        """
+        Push a URL onto the frontier with its current priority.
+        """
+        heapq.heappush(self.frontier, (
+            self.priority(url, depth, parent_relevance),
+            next(self.counter),
+            url,
+            depth,
+            parent_relevance,
+        ))
+
+    def pop(self):
+        """
+        Pop the URL with the best current priority.
+
+        Priorities depend on how many pages were crawled from a domain, which
+        grows after a URL is queued. Stale entries are re-scored on pop and
+        pushed back if they are no longer ahead of the next entry.
+
+        Returns:
+            tuple: (url, depth) of the next URL to crawl.
+        """
+        while True:
+            priority, _, url, depth, parent_relevance = heapq.heappop(self.frontier)
+            current = self.priority(url, depth, parent_relevance)
+            if current <= priority or not self.frontier or current <= self.frontier[0][0]:
+                return url, depth
+            heapq.heappush(self.frontier, (current, next(self.counter), url, depth, parent_relevance))
+
+    def crawl(self, on_page=None):
+        """
+        Crawl until the frontier is empty or a budget is exhausted.
+
+        Budgets apply to this call only, so a resumed crawl gets a fresh page,
+        byte and time budget. The checkpoint is removed once the frontier is
+        exhausted.
+
+        Args:
+            on_page (callable): Optional callback receiving (url, PageContent).
+
+        Returns:
+            dict: Crawl statistics.
+        """
+        start_time = time.time()
+        since_checkpoint = 0
+        run_pages = run_bytes = 0
+
+        while self.frontier:
+            if run_pages >= self.max_pages:
+                self.logger.info("Page budget exhausted.")
+                break
+            if run_bytes >= self.max_bytes:
+                self.logger.info("Byte budget exhausted.")
+                break
+            if time.time() - start_time >= self.max_seconds:
+                self.logger.info("Time budget exhausted.")
+                break
+
+            url, depth = self.pop()
+            if not self.web_scraper.can_fetch(url):
+                self.logger.info(f"Skipping {url} (disallowed by robots.txt).")
+                continue
+
+            self.logger.info(f"Crawling {url} (depth {depth})...")
+            fetched = self.web_scraper.fetch_page(url)
+            if not fetched:
+                continue
+            body, encoding = fetched
+
+            domain = urlparse(url).netloc
+            self.bytes_fetched += len(body)
+            self.domain_counts[domain] = self.domain_counts.get(domain, 0) + 1
+            self.pages_crawled += 1
+            run_bytes += len(body)
+            run_pages += 1
+
+            page = self.web_scraper.extract_content(body, url, encoding=encoding)
+            page_relevance = self.relevance(f"{page.title or ''} {page.content}")
+
+            if self.local_index is not None:
+                self.local_index.add_page(url, page.title, domain, page.content)
+            if on_page:
+                on_page(url, page)
+
+            for link in page.links:
+                self.enqueue(link, depth + 1, page_relevance)
+
+            since_checkpoint += 1
+            if since_checkpoint >= self.checkpoint_every:
+                self.save_checkpoint()
+                since_checkpoint = 0
+
+        if self.frontier:
+            self.save_checkpoint()
+        else:
+            self.logger.info("Frontier exhausted; crawl finished.")
+            self.remove_checkpoint()
+        return {
+            "pages_crawled": run_pages,
+            "bytes_fetched": run_bytes,
+            "total_pages_crawled": self.pages_crawled,
+            "total_bytes_fetched": self.bytes_fetched,
+            "frontier_size": len(self.frontier),
+            "elapsed_seconds": time.time() - start_time,
+        }
+
+    def save_checkpoint(self):
+        """
+        Persist the frontier, seen-set and counters to the checkpoint file.
+        """
+        if not self.checkpoint_path:
+            return
+        state = {
+            "frontier": [[priority, url, depth, parent_relevance]
+                         for priority, _, url, depth, parent_relevance in self.frontier],
+            "seen": self.seen.to_dict(),
+            "domain_counts": self.domain_counts,
+            "pages_crawled": self.pages_crawled,
+            "bytes_fetched": self.bytes_fetched,
+        }
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def load_checkpoint(self):
+        """
+        Restore crawl state from the checkpoint file if it exists.
+
+        Returns:
+            bool: True if a checkpoint was loaded.
+        """
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return False
+        try:
+            with open(self.checkpoint_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable checkpoint {self.checkpoint_path}: {e}")
+            return False
+
+        self.frontier = [
+            (priority, next(self.counter), url, depth, parent_relevance)
+            for priority, url, depth, parent_relevance in state["frontier"]
+        ]
+        heapq.heapify(self.frontier)
+        self.seen = BloomFilter.from_dict(state["seen"])
+        self.domain_counts = state["domain_counts"]
+        self.pages_crawled = state["pages_crawled"]
+        self.bytes_fetched = state["bytes_fetched"]
+        self.logger.info(
+            f"Resumed crawl with {len(self.frontier)} queued URLs and {self.pages_crawled} pages crawled.")
+        return True
+
+    def remove_checkpoint(self):
+        """
+        Delete the checkpoint file so the next crawl starts from its seeds.
+        """
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+
+if __name__ == "__main__":
+    from local_index import LocalIndex
+
+    parser = argparse.ArgumentParser(
+        description="Crawl a topic area and add the pages to the local index.")
+    parser.add_argument("seeds", nargs="+", help="Start URLs")
+    parser.add_argument("--topic", type=str,
+                        help="Comma-separated topic keywords used to prioritize links")
+    parser.add_argument("--max_pages", type=int, default=100,
+                        help="Maximum number of pages to crawl")
+    parser.add_argument("--max_mb", type=float, default=50,
+                        help="Maximum megabytes of HTML to download")
+    parser.add_argument("--max_minutes", type=float, default=60,
+                        help="Maximum crawl time in minutes")
+    parser.add_argument("--max_depth", type=int, default=3,
+                        help="Maximum link depth from the seeds")
+    parser.add_argument("--same_domain", action="store_true",
+                        help="Only follow links within the seed domains")
+    parser.add_argument("--cache_dir", type=str, default="cache",
+                        help="Cache directory holding the local index")
+    parser.add_argument("--checkpoint", type=str, default="cache/crawl_checkpoint.json",
+                        help="Checkpoint file used to resume interrupted crawls")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Discard an existing checkpoint and start from the seeds")
+
+    args = parser.parse_args()
+
+    topic_keywords = [kw.strip() for kw in args.topic.split(
+        ",")] if args.topic else None
+
+    crawler = Crawler(
+        args.seeds,
+        topic_keywords=topic_keywords,
+        local_index=LocalIndex(os.path.join(args.cache_dir, "index.db")),
+        max_pages=args.max_pages,
+        max_bytes=int(args.max_mb * 1_000_000),
+        max_seconds=args.max_minutes * 60,
+        max_depth=args.max_depth,
+        same_domain=args.same_domain,
+        checkpoint_path=args.checkpoint,
+        fresh=args.fresh,
+    )
+    stats = crawler.crawl()
+    print(json.dumps(stats, indent=4))
@@ -0,0 +1,302 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import zlib
+
+CSV_FIELDS = ["query", "title", "snippet", "link", "source", "scraped_content"]
+
+# Read size used when scanning an existing output file
+CHUNK_SIZE = 1 << 16
+
+
+class StreamingExporter:
+    def __init__(self, output_path, output_format=None, compress=None):
+        """
+        Initialize an exporter that appends one record per scraped result.
+
+        Every record is flushed as soon as it is written, so a crashed batch
+        keeps everything exported so far. Queries are journaled as started
+        and complete in a '<output_path>.progress' file next to the output,
+        so a rerun can skip finished queries and resume interrupted ones.
+
+        Args:
+            output_path (str): File to append to.
+            output_format (str): 'jsonl' or 'csv' (inferred from the path if omitted).
+            compress (bool): Gzip the output (inferred from a '.gz' suffix if omitted).
+        """
+        self.compress = output_path.endswith(".gz") if compress is None else compress
+        base_path = output_path[:-3] if output_path.endswith(".gz") else output_path
+        self.output_format = output_format or (
+            "csv" if base_path.endswith(".csv") else "jsonl")
+        if self.output_format not in ("jsonl", "csv"):
+            raise ValueError(
+                f"Unsupported streaming format: {self.output_format}. Use 'jsonl' or 'csv'.")
+        self.output_path = output_path
+        self.progress_path = f"{output_path}.progress"
+        self.file = None
+        self.writer = None
+        # (query, link) pairs exported before a crash, skipped by write()
+        self.skip = set()
+
+    def _open(self, mode):
+        if self.compress:
+            return gzip.open(self.output_path, mode, encoding="utf-8", newline="")
+        return open(self.output_path, mode, encoding="utf-8", newline="")
+
+    def open(self):
+        """
+        Open the output file for appending, writing a CSV header if it is new.
+
+        A record left half-written by a crash is cut off first, so the file
+        only ever holds complete records.
+        """
+        directory = os.path.dirname(self.output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        is_new = not os.path.exists(self.output_path) or self.repair() == 0
+        self.file = self._open("at")
+        if self.output_format == "csv":
+            self.writer = csv.DictWriter(
+                self.file, fieldnames=CSV_FIELDS, extrasaction="ignore")
+            if is_new:
+                self.writer.writeheader()
+                self.file.flush()
+        return self
+
+    def _complete_size(self, f, size):
+        """
+        Find the byte offset just past the last complete record of a plain file.
+
+        For JSONL only the tail after the last newline is read. CSV fields may
+        contain newlines, but the writer quotes them, so a CRLF ends a row
+        exactly when an even number of quotes precedes it; the file is streamed
+        once counting quotes, in constant memory.
+        """
+        if self.output_format != "csv":
+            position = size
+            while position > 0:
+                start = max(0, position - CHUNK_SIZE)
+                f.seek(start)
+                index = f.read(position - start).rfind(b"\n")
+                if index >= 0:
+                    return start + index + 1
+                position = start
+            return 0
+
+        f.seek(0)
+        keep = quotes = offset = 0
+        pending_cr = False  # Chunk ended between \r and \n
+        while chunk := f.read(CHUNK_SIZE):
+            if pending_cr and chunk.startswith(b"\n") and quotes % 2 == 0:
+                keep = offset + 1
+            # Only the last row end in the chunk matters, so search from the back
+            end = len(chunk)
+            while (index := chunk.rfind(b"\r\n", 0, end)) >= 0:
+                if (quotes + chunk.count(b'"', 0, index)) % 2 == 0:
+                    keep = offset + index + 2
+                    break
+                end = index + 1
+            quotes += chunk.count(b'"')
+            pending_cr = chunk.endswith(b"\r")
+            offset += len(chunk)
+        return keep
+
+    def _gzip_members(self, f):
+        """
+        Stream through a gzip file and return the offset where its first
+        incomplete member starts, or None if every member is complete.
+        """
+        offset = 0  # Start of the member being decompressed
+        position = 0  # Bytes of the file consumed so far
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        while chunk := f.read(CHUNK_SIZE):
+            position += len(chunk)
+            data = chunk
+            while data:
+                try:
+                    # Output is discarded; max_length keeps memory bounded
+                    decompressor.decompress(data, CHUNK_SIZE)
+                    while decompressor.unconsumed_tail and not decompressor.eof:
+                        decompressor.decompress(decompressor.unconsumed_tail, CHUNK_SIZE)
+                except zlib.error:
+                    return offset
+                if not decompressor.eof:
+                    break
+                data = decompressor.unused_data
+                offset = position - len(data)
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        return None if offset == position else offset
+
+    def _repair_gzip(self):
+        # Every open() appends a new member; only the last one can be truncated
+        with open(self.output_path, "rb") as f:
+            offset = self._gzip_members(f)
+            if offset is None:
+                return os.path.getsize(self.output_path)
+
+            # Salvage the complete records of the truncated member into a temp file
+            with tempfile.TemporaryFile() as salvaged:
+                f.seek(offset)
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                try:
+                    while chunk := f.read(CHUNK_SIZE):
+                        while chunk and not decompressor.eof:
+                            salvaged.write(decompressor.decompress(chunk, CHUNK_SIZE))
+                            chunk = decompressor.unconsumed_tail
+                except zlib.error:
+                    pass
+                keep = self._complete_size(salvaged, salvaged.tell())
+                salvaged.truncate(keep)
+
+                with open(self.output_path, "r+b") as out:
+                    out.truncate(offset)
+                if keep:
+                    salvaged.seek(0)
+                    with gzip.open(self.output_path, "ab") as out:
+                        shutil.copyfileobj(salvaged, out)
+        return os.path.getsize(self.output_path)
+
+    def repair(self):
+        """
+        Cut the output file back to its last complete record.
+
+        Returns:
+            int: Size of the repaired file in bytes (0 if it holds no records).
+        """
+        if self.compress:
+            return self._repair_gzip()
+        size = os.path.getsize(self.output_path)
+        with open(self.output_path, "r+b") as f:
+            keep = self._complete_size(f, size)
+            if keep < size:
+                f.truncate(keep)
+        return keep
+
+    def write(self, record):
+        """
+        Append a single result record and flush it to disk.
+
+        Args:
+            record (dict): Result record to export.
+        """
+        if (record.get("query"), record.get("link")) in self.skip:
+            return
+        if self.file is None:
+            self.open()
+        if self.output_format == "csv":
+            self.writer.writerow(record)
+        else:
+            self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def exported(self, field="query", query=None):
+        """
+        Collect the values of a field across the records already in the file.
+
+        Args:
+            field (str): Record field to collect, e.g. 'query' or 'link'.
+            query (str): Only look at records of this query.
+
+        Returns:
+            set: Values of the field.
+        """
+        if not os.path.exists(self.output_path):
+            return set()
+        if self.file is not None:
+            self.file.flush()
+
+        values = set()
+        with self._open("rt") as f:
+            try:
+                for record in (csv.DictReader(f) if self.output_format == "csv"
+                               else self._json_records(f)):
+                    if query is None or record.get("query") == query:
+                        values.add(record.get(field))
+            except EOFError:
+                pass  # Gzip member still open or truncated by a crash
+        values.discard(None)
+        return values
+
+    @staticmethod
+    def _json_records(f):
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue  # Partially written line from a crash
+
+    def _journal(self, state, query):
+        with open(self.progress_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps([state, query], ensure_ascii=False) + "\n")
+
+    def _state(self, query):
+        # Latest progress entry for the query: None, 'started' or 'complete'
+        state = None
+        if os.path.exists(self.progress_path):
+            with open(self.progress_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry_state, entry_query = json.loads(line)
+                    except ValueError:
+                        continue  # Partially written line from a crash
+                    if entry_query == query:
+                        state = entry_state
+        return state
+
+    def is_complete(self, query):
+        """
+        Check whether a query was fully exported by an earlier run.
+
+        Args:
+            query (str): Query to look up.
+
+        Returns:
+            bool: True if mark_complete was called for the query.
+        """
+        return self._state(query) == "complete"
+
+    def resume(self, query):
+        """
+        Prepare to export a query, skipping results an interrupted run already wrote.
+
+        The output file is only scanned when an earlier run started the
+        query without finishing it.
+
+        Args:
+            query (str): Query about to be run.
+        """
+        # Repair first, so a half-written record is not mistaken for an exported one
+        if self.file is None:
+            self.open()
+        if self._state(query) == "started":
+            self.skip.update((query, link) for link in self.exported("link", query=query))
+        self._journal("started", query)
+
+    def mark_complete(self, query):
+        """
+        Record that every result of a query has been exported.
+
+        Args:
+            query (str): The finished query.
+        """
+        if self.file is not None:
+            self.file.flush()
+        self._journal("complete", query)
+
+    def close(self):
+        """
+        Close the output file.
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            self.writer = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,134 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import logging
+
+# Common English words that say nothing about what a query is about
+STOPWORDS = frozenset("""
+a about above after again all am an and any are as at be because been before being
+between both but by can could did do does doing down during each few for from further
+had has have having he her here hers him his how i if in into is it its itself just
+me more most my no nor not now of off on once only or other our out over own same she
+should so some such than that the their theirs them then there these they this those
+through to too under until up very was we were what when where which while who whom
+why will with would you your yours
+""".split())
+
+
+class LocalIndex:
+    def __init__(self, db_path="cache/index.db"):
+        """
+        Initialize the local full-text index of scraped pages.
+
+        Args:
+            db_path (str): Path to the SQLite database holding the FTS5 index.
+        """
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5("
+            "url UNINDEXED, title, source UNINDEXED, fetched_at UNINDEXED, content, "
+            "tokenize = 'porter unicode61')"
+        )
+        self.conn.commit()
+
+        logging.basicConfig(level=logging.INFO,
+                            format="%(asctime)s - %(levelname)s - %(message)s")
+        self.logger = logging.getLogger("LocalIndex")
+
+    def add_page(self, url, title, source, content, fetched_at=None):
+        """
+        Index a scraped page, replacing any earlier copy of the same URL.
+
+        Args:
+            url (str): URL of the page.
+            title (str): Page title.
+            source (str): Domain the page was fetched from.
+            content (str): Extracted page content.
+            fetched_at (float): Fetch time as a Unix timestamp (defaults to now).
+        """
+        fetched_at = fetched_at if fetched_at is not None else time.time()
+        with self.lock:
+            self.conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+            self.conn.execute(
+                "INSERT INTO pages (url, title, source, fetched_at, content) VALUES (?, ?, ?, ?, ?)",
+                (url, title or "No Title", source, fetched_at, content),
+            )
+            self.conn.commit()
+
+    def search(self, query, limit=5, min_term_fraction=0.75):
+        """
+        Search the index, ranking pages by BM25.
+
+        Stopwords are dropped from the query, and a page only counts as a hit
+        if it contains at least min_term_fraction of the remaining terms, so
+        the number of hits reflects how well the index covers the query.
+
+        Args:
+            query (str): Free-text query.
+            limit (int): Maximum number of pages to return.
+            min_term_fraction (float): Fraction of query terms a page must contain.
+
+        Returns:
+            list: Matching pages with url, title, source, fetched_at, content,
+            the fraction of terms matched and the BM25 score (lower is better).
+        """
+        terms = [term for term in dict.fromkeys(re.findall(r"\w+", query.lower()))
+                 if term not in STOPWORDS]
+        # A query made only of stopwords says nothing the index could match on
+        if not terms:
+            return []
+
+        try:
+            with self.lock:
+                # Quote every term so user input can never be parsed as FTS5 syntax
+                matched = {}
+                for term in terms:
+                    for (rowid,) in self.conn.execute(
+                            "SELECT rowid FROM pages WHERE pages MATCH ?", (f'"{term}"',)):
+                        matched[rowid] = matched.get(rowid, 0) + 1
+
+                needed = min_term_fraction * len(terms)
+                match = " OR ".join(f'"{term}"' for term in terms)
+                rows = []
+                for row in self.conn.execute(
+                        "SELECT rowid, url, title, source, fetched_at, content, bm25(pages) FROM pages "
+                        "WHERE pages MATCH ? ORDER BY bm25(pages)", (match,)):
+                    if matched.get(row[0], 0) >= needed:
+                        rows.append(row)
+                        if len(rows) >= limit:
+                            break
+        except sqlite3.Error as e:
+            self.logger.error(f"Error searching local index: {e}")
+            return []
+
+        return [
+            {
+                "url": url,
+                "title": title,
+                "source": source,
+                "fetched_at": float(fetched_at),
+                "content": content,
+                "term_fraction": matched[rowid] / len(terms),
+                "score": score,
+            }
+            for rowid, url, title, source, fetched_at, content, score in rows
+        ]
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def close(self):
+        """
+        Close the underlying database connection.
+        """
+        with self.lock:
+            self.conn.close()
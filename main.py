@@ -1,5 +1,4 @@
 import argparse
-from search_and_scrape import SearchAndScrape
 from rich.console import Console
 
 
@@ -22,8 +21,24 @@ def main():
                         help="Comma-separated keywords to include in search results")
     parser.add_argument("--exclude", type=str,
                         help="Comma-separated keywords to exclude from search results")
-    parser.add_argument("--export", type=str, choices=["json", "csv"], default="json",
+    parser.add_argument("--export", type=str, choices=["json", "csv", "jsonl"], default="json",
                         help="Export format for results (default: 'json')")
+    parser.add_argument("--output", type=str,
+                        help="Export file path (default: search_and_scrape_results.<format>)")
+    parser.add_argument("--stream", type=str,
+                        help="Append each result to this .jsonl/.csv file (optionally .gz) as it is scraped; "
+                             "queries fully exported by an earlier run are skipped")
+    parser.add_argument("--offline_first", action="store_true",
+                        help="Answer from the local page index before searching the web")
+    parser.add_argument("--answer_mode", type=str, choices=["concat", "map_reduce", "retrieval"], default="concat",
+                        help="'map_reduce' summarizes pages in parallel before answering; 'retrieval' "
+                             "answers from the passages most similar to the query (default: 'concat')")
+    parser.add_argument("--llm_batching", action="store_true",
+                        help="Route LLM calls through the micro-batching dispatcher, capping concurrent "
+                             "requests and queueing page summaries behind interactive calls")
+    parser.add_argument("--llm_priority", type=str, choices=["interactive", "batch"], default="interactive",
+                        help="Dispatcher queue for query reformulation; use 'batch' for unattended runs "
+                             "(default: 'interactive')")
 
     args = parser.parse_args()
 
@@ -38,8 +53,25 @@ def main():
     exclude_keywords = [kw.strip() for kw in args.exclude.split(
         ",")] if args.exclude else None
 
+    # Imported after argument parsing so --help and usage errors return immediately
+    from search_and_scrape import SearchAndScrape
+    from exporter import StreamingExporter
+
+    exporter = StreamingExporter(args.stream) if args.stream else None
+
+    # Resume batch runs: finished queries are skipped, and a query cut short by a
+    # crash is run again without re-exporting the results it already wrote
+    if exporter is not None:
+        if exporter.is_complete(args.query):
+            console.print(
+                f"[yellow]Query already exported to {args.stream}; skipping.[/yellow]")
+            return
+        exporter.resume(args.query)
+
     # Initialize Search and Scrape
-    search_and_scrape = SearchAndScrape(max_results=args.results)
+    search_and_scrape = SearchAndScrape(
+        max_results=args.results, answer_mode=args.answer_mode,
+        llm_batching=args.llm_batching, llm_priority=args.llm_priority)
 
     console.print("[bold cyan]Executing Search and Scrape...[/bold cyan]")
 
@@ -50,7 +82,11 @@ def main():
             time_range=args.time_range,
             include_keywords=include_keywords,
             exclude_keywords=exclude_keywords,
+            offline_first=args.offline_first,
+            exporter=exporter,
         )
+        if exporter is not None:
+            exporter.mark_complete(args.query)
 
         # Display results
         if data.get("results"):
@@ -59,12 +95,16 @@ def main():
             search_and_scrape.display_results(data)
 
             # Export results if required
-            search_and_scrape.export_results(data, output_format=args.export)
+            search_and_scrape.export_results(
+                data, output_format=args.export, output_path=args.output, query=args.query)
         else:
             console.print("[yellow]No results found or processed.[/yellow]")
 
     except Exception as e:
         console.print(f"[red]An error occurred: {e}[/red]")
+    finally:
+        if exporter is not None:
+            exporter.close()
 
 
 if __name__ == "__main__":
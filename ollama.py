@@ -1,12 +1,25 @@
-import requests
+import json
+import threading
+import time
 import logging
+from collections import deque
+from concurrent.futures import Future
 
 
 class LLMIntegration:
-    def __init__(self, base_url="http://localhost:11434", model="llama3.1:latest", timeout=30):
+    # Single-request prompts shared by the direct and dispatched paths
+    PROMPTS = {
+        "reformulate": "Reformulate the query: {}",
+        "analyze": "Analyze this content: {}",
+    }
+
+    def __init__(self, base_url="http://localhost:11434", model="llama3.1:latest", timeout=30,
+                 embedding_model="nomic-embed-text"):
         self.base_url = base_url
         self.model = model
+        self.embedding_model = embedding_model
         self.timeout = timeout
+        self.dispatcher = None
         logging.basicConfig(level=logging.INFO,
                             format="%(asctime)s - %(levelname)s - %(message)s")
         self.logger = logging.getLogger("LLMIntegration")
@@ -15,6 +28,8 @@ class LLMIntegration:
         """
         Interact with the /api/generate endpoint for streaming-like tasks.
         """
+        import requests
+
         url = f"{self.base_url}/api/generate"
         payload = {"model": self.model, "prompt": prompt}
 
@@ -39,6 +54,8 @@ class LLMIntegration:
         """
         Interact with the /v1/chat/completions endpoint for structured chat tasks.
         """
+        import requests
+
         url = f"{self.base_url}/v1/chat/completions"
         payload = {"model": self.model, "messages": messages}
 
@@ -53,60 +70,313 @@ class LLMIntegration:
                 f"Error communicating with the LLM (chat completions): {e}")
             return None
 
-    def reformulate_query(self, query):
+    def embed(self, texts, batch_size=32):
+        """
+        Embed texts in batches with the /api/embed endpoint.
+
+        Args:
+            texts (list): Texts to embed.
+            batch_size (int): Number of texts sent per request.
+
+        Returns:
+            list: One embedding per text, or None if any batch failed.
+        """
+        import requests
+
+        url = f"{self.base_url}/api/embed"
+        embeddings = []
+        for start in range(0, len(texts), batch_size):
+            payload = {"model": self.embedding_model,
+                       "input": texts[start:start + batch_size]}
+            try:
+                response = requests.post(url, json=payload, timeout=self.timeout)
+                response.raise_for_status()
+                embeddings.extend(response.json()["embeddings"])
+            except (requests.RequestException, KeyError, ValueError) as e:
+                self.logger.error(
+                    f"Error communicating with the LLM (embed): {e}")
+                return None
+        return embeddings
+
+    def prompt_messages(self, kind, payload):
+        """
+        Build the chat messages for a single reformulate or analyze request.
+
+        Args:
+            kind (str): 'reformulate' or 'analyze'.
+            payload (str): Query or content for the request.
+
+        Returns:
+            list: Messages for the chat completions endpoint.
+        """
+        if kind not in self.PROMPTS:
+            raise ValueError(f"Unknown request kind: {kind}")
+        return [{"role": "user", "content": self.PROMPTS[kind].format(payload)}]
+
+    def enable_batching(self, num_parallel=4, max_batch_size=8, max_wait=0.05):
+        """
+        Route reformulation and analysis calls through a micro-batching dispatcher.
+
+        Args:
+            num_parallel (int): Maximum concurrent requests, matching the server's OLLAMA_NUM_PARALLEL.
+            max_batch_size (int): Maximum number of requests merged into one batch.
+            max_wait (float): Seconds a batch-priority request may wait for others to join it.
+
+        Returns:
+            LLMDispatcher: The running dispatcher.
+        """
+        if self.dispatcher is None:
+            self.dispatcher = LLMDispatcher(
+                self, num_parallel=num_parallel, max_batch_size=max_batch_size, max_wait=max_wait)
+        return self.dispatcher
+
+    def disable_batching(self):
+        """
+        Stop the dispatcher and go back to one direct request per call.
+        """
+        if self.dispatcher is not None:
+            self.dispatcher.close()
+            self.dispatcher = None
+
+    def reformulate_query(self, query, priority="interactive"):
         """
         Reformulate user queries using the chat completions endpoint.
         """
+        if self.dispatcher is not None:
+            return self.dispatcher.submit("reformulate", query, priority).result()
+        return self.call_chat_completions_endpoint(self.prompt_messages("reformulate", query))
+
+    def reformulate_queries(self, queries):
+        """
+        Reformulate several queries with a single structured prompt.
+
+        Args:
+            queries (list): Queries to reformulate.
+
+        Returns:
+            list: One reformulation per query, or None if the reply could not be parsed.
+        """
+        numbered = "\n".join(f"{i}. {query}" for i, query in enumerate(queries, 1))
         messages = [
-            {"role": "user", "content": f"Reformulate the query: {query}"}]
-        return self.call_chat_completions_endpoint(messages)
+            {"role": "user", "content": (
+                "Reformulate each of the following queries. Reply with only a JSON array of "
+                "strings containing one reformulated query per input, in the same order.\n\n"
+                f"{numbered}"
+            )}]
+        reply = self.call_chat_completions_endpoint(messages)
+        if not reply:
+            return None
+        try:
+            reformulated = json.loads(reply[reply.index("["):reply.rindex("]") + 1])
+        except ValueError:
+            return None
+        if len(reformulated) != len(queries) or not all(isinstance(r, str) for r in reformulated):
+            return None
+        return [r.strip() for r in reformulated]
 
-    def analyze_content(self, content):
+    def analyze_content(self, content, priority="interactive"):
         """
         Analyze and summarize scraped content using the chat completions endpoint.
         """
+        if self.dispatcher is not None:
+            return self.dispatcher.submit("analyze", content, priority).result()
+        return self.call_chat_completions_endpoint(self.prompt_messages("analyze", content))
+
+    def combine_summaries(self, query, summaries):
+        """
+        Answer a query from per-page summaries (the reduce step of map-reduce answering).
+
+        Args:
+            query (str): The user's search query.
+            summaries (list): Summaries of the scraped pages.
+
+        Returns:
+            str: The final answer generated by the LLM.
+        """
+        numbered = "\n\n".join(
+            f"[{i}] {summary}" for i, summary in enumerate(summaries, 1))
         messages = [
-            {"role": "user", "content": f"Analyze this content: {content}"}]
+            {"role": "user", "content": (
+                f"Based on the following summaries of web pages, provide a comprehensive answer "
+                f"to the query.\n\nQuery: {query}\n\nSummaries:\n{numbered}\n\nAnswer:"
+            )}]
         return self.call_chat_completions_endpoint(messages)
 
-def generate_final_answer(self, query, content):
-    """
-    Generate a final answer using the query and scraped content.
-
-    Args:
-        query (str): The user's search query.
-        content (str): The content scraped from the web.
-
-    Returns:
-        str: The final answer generated by the LLM.
-    """
-    prompt = (
-        f"Based on the following query and content, provide a comprehensive answer:\n\n"
-        f"Query: {query}\n\nContent:\n{content}\n\nAnswer:"
-    )
-
-    payload = {
-        "model": self.model,
-        "prompt": prompt
-    }
+    def generate_final_answer(self, query, content):
+        """
+        Generate a final answer using the query and scraped content.
 
-    # Log the payload for debugging
-    self.logger.info(f"Payload sent to /api/generate: {payload}")
+        Args:
+            query (str): The user's search query.
+            content (str): The content scraped from the web.
 
-    try:
-        response = requests.post(
-            f"{self.base_url}/api/generate",
-            json=payload,
-            timeout=self.timeout
+        Returns:
+            str: The final answer generated by the LLM.
+        """
+        import requests
+
+        prompt = (
+            f"Based on the following query and content, provide a comprehensive answer:\n\n"
+            f"Query: {query}\n\nContent:\n{content}\n\nAnswer:"
         )
-        response.raise_for_status()
-        data = response.json()
-
-        # Extract the response text
-        return data.get("response", "No response generated.")
-    except requests.RequestException as e:
-        self.logger.error(f"Error communicating with the LLM (generate): {e}")
-        return None
-    except ValueError as e:
-        self.logger.error(f"Error parsing response JSON (generate): {e}")
-        return None
+
+        payload = {
+            "model": self.model,
+            "prompt": prompt
+        }
+
+        # Log the payload for debugging
+        self.logger.info(f"Payload sent to /api/generate: {payload}")
+
+        try:
+            response = requests.post(
+                f"{self.base_url}/api/generate",
+                json=payload,
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            data = response.json()
+
+            # Extract the response text
+            return data.get("response", "No response generated.")
+        except requests.RequestException as e:
+            self.logger.error(f"Error communicating with the LLM (generate): {e}")
+            return None
+        except ValueError as e:
+            self.logger.error(f"Error parsing response JSON (generate): {e}")
+            return None
+
+
+class LLMDispatcher:
+    PRIORITIES = ("interactive", "batch")
+
+    def __init__(self, llm, num_parallel=4, max_batch_size=8, max_wait=0.05):
+        """
+        Initialize the dispatcher that micro-batches LLM requests.
+
+        Interactive requests are dispatched as soon as a request slot frees up.
+        Batch requests wait up to max_wait for others of the same kind, then
+        go out together: reformulations are merged into one structured prompt,
+        and analyses run side by side up to num_parallel.
+
+        Args:
+            llm (LLMIntegration): Integration whose endpoints execute the requests.
+            num_parallel (int): Maximum concurrent requests to the server.
+            max_batch_size (int): Maximum number of requests per batch.
+            max_wait (float): Maximum seconds a batch request waits to be batched.
+        """
+        self.llm = llm
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.queues = {priority: deque() for priority in self.PRIORITIES}
+        # Units of a due batch that are still waiting for a free slot
+        self.ready = deque()
+        self.condition = threading.Condition()
+        self.slots = threading.BoundedSemaphore(num_parallel)
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="LLMDispatcher", daemon=True)
+        self.thread.start()
+
+    def submit(self, kind, payload, priority="interactive"):
+        """
+        Queue a request.
+
+        Args:
+            kind (str): 'reformulate' or 'analyze'.
+            payload (str): Query or content for the request.
+            priority (str): 'interactive' or 'batch'.
+
+        Returns:
+            Future: Resolves to the LLM's reply.
+        """
+        if priority not in self.queues:
+            raise ValueError(f"Unknown priority: {priority}")
+        future = Future()
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("Dispatcher is closed.")
+            self.queues[priority].append((kind, payload, future, time.monotonic()))
+            self.condition.notify()
+        return future
+
+    def _take(self, queue):
+        # Pop up to max_batch_size requests of the same kind as the oldest one
+        kind = queue[0][0]
+        batch, rest = [], deque()
+        while queue:
+            request = queue.popleft()
+            if request[0] == kind and len(batch) < self.max_batch_size:
+                batch.append(request)
+            else:
+                rest.append(request)
+        queue.extend(rest)
+        # Reformulations are merged into one prompt; anything else runs one request per slot
+        if kind == "reformulate" and len(batch) > 1:
+            return [batch]
+        return [[request] for request in batch]
+
+    def _next_unit(self):
+        # Called with a slot held, so the interactive queue is checked right before dispatch
+        with self.condition:
+            while True:
+                interactive = self.queues["interactive"]
+                if interactive:
+                    if interactive[0][0] == "reformulate":
+                        return self._take(interactive)[0]
+                    return [interactive.popleft()]
+                if self.ready:
+                    return self.ready.popleft()
+                queue = self.queues["batch"]
+                if queue:
+                    deadline = queue[0][3] + self.max_wait
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or len(queue) >= self.max_batch_size or self.closed:
+                        self.ready.extend(self._take(queue))
+                        continue
+                    self.condition.wait(remaining)
+                elif self.closed:
+                    return None
+                else:
+                    self.condition.wait()
+
+    def _run(self):
+        while True:
+            # Take work only once a slot is free, so a waiting interactive request
+            # is never stuck behind batch work already taken from its queue
+            self.slots.acquire()
+            unit = self._next_unit()
+            if unit is None:
+                self.slots.release()
+                return
+            threading.Thread(target=self._execute, args=(unit,), daemon=True).start()
+
+    def _execute(self, unit):
+        try:
+            kind = unit[0][0]
+            if kind == "reformulate" and len(unit) > 1:
+                replies = self.llm.reformulate_queries([payload for _, payload, _, _ in unit])
+                if replies is None:
+                    # Structured reply unusable; fall back to one prompt per query
+                    replies = [self._call_single(kind, payload) for _, payload, _, _ in unit]
+            else:
+                replies = [self._call_single(kind, unit[0][1])]
+            for (_, _, future, _), reply in zip(unit, replies):
+                future.set_result(reply)
+        except Exception as e:
+            for _, _, future, _ in unit:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self.slots.release()
+
+    def _call_single(self, kind, payload):
+        return self.llm.call_chat_completions_endpoint(self.llm.prompt_messages(kind, payload))
+
+    def close(self):
+        """
+        Dispatch any queued requests and stop the dispatcher thread.
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
@@ -0,0 +1,65 @@
+from dataclasses import dataclass, field, asdict
+from typing import List, Optional
+
+
+class _Record:
+    """
+    Read-only mapping access for record classes, so code written against the
+    old result dicts (``result["title"]``, ``result.get("content")``) keeps working.
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def to_dict(self):
+        """
+        Convert the record to a plain dict for export and caching.
+        """
+        return asdict(self)
+
+
+@dataclass(slots=True)
+class SearchHit(_Record):
+    title: str
+    link: str
+    snippet: str
+
+
+@dataclass(slots=True)
+class PageContent(_Record):
+    title: Optional[str]
+    content: str
+    links: List[str] = field(default_factory=list)
+    description: str = "No Description"
+    keywords: str = "No Keywords"
+    # None when the page could not be fetched or was disallowed
+    content_hash: Optional[str] = None
+
+
+@dataclass(slots=True)
+class ResultRecord(_Record):
+    title: str
+    snippet: str
+    link: str
+    scraped_content: str
+    source: str
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Build a record from a dict produced by to_dict (extra keys are ignored).
+        """
+        return cls(
+            title=data.get("title"),
+            snippet=data.get("snippet"),
+            link=data.get("link"),
+            scraped_content=data.get("scraped_content"),
+            source=data.get("source"),
+        )
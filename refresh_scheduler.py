@@ -0,0 +1,328 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+import logging
+from urllib.parse import urlparse
+
+
+class RefreshScheduler:
+    def __init__(self,
+                 web_scraper,
+                 cache,
+                 db_path="cache/refresh.db",
+                 local_index=None,
+                 fetch_budget=20,
+                 initial_interval=86400,
+                 min_interval=3600,
+                 max_interval=30 * 86400,
+                 max_failures=5):
+        """
+        Initialize the incremental re-crawl scheduler.
+
+        Each tracked URL gets its own revalidation interval. The interval is
+        halved whenever a revalidation finds new content and grown by half when
+        it finds the same content, so pages are checked roughly as often as
+        they actually change. Failed fetches back off the same way, and a URL
+        that fails max_failures times in a row is no longer tracked.
+
+        Args:
+            web_scraper (WebScraper): Scraper used to refetch pages.
+            cache (ResultCache): Cache of final answers to invalidate.
+            db_path (str): Path to the SQLite database holding refresh state.
+            local_index (LocalIndex): Optional index updated with refreshed content.
+            fetch_budget (int): Maximum number of pages to refetch per cycle.
+            initial_interval (float): Revalidation interval for new URLs in seconds.
+            min_interval (float): Shortest revalidation interval in seconds.
+            max_interval (float): Longest revalidation interval in seconds.
+            max_failures (int): Consecutive failed revalidations before a URL is dropped.
+        """
+        self.web_scraper = web_scraper
+        self.cache = cache
+        self.local_index = local_index
+        self.fetch_budget = fetch_budget
+        self.initial_interval = initial_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_failures = max_failures
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                content_hash TEXT,
+                last_checked REAL,
+                interval REAL,
+                checks INTEGER DEFAULT 0,
+                changes INTEGER DEFAULT 0,
+                failures INTEGER DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS answer_pages (
+                cache_key TEXT,
+                url TEXT,
+                PRIMARY KEY (cache_key, url)
+            );
+            CREATE INDEX IF NOT EXISTS answer_pages_url ON answer_pages (url);
+            """
+        )
+        # Databases created before failures were tracked lack the column
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(pages)")]
+        if "failures" not in columns:
+            self.conn.execute("ALTER TABLE pages ADD COLUMN failures INTEGER DEFAULT 0")
+        self.conn.commit()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        logging.basicConfig(level=logging.INFO,
+                            format="%(asctime)s - %(levelname)s - %(message)s")
+        self.logger = logging.getLogger("RefreshScheduler")
+
+    def track(self, url, content_hash, fetched_at=None):
+        """
+        Record a freshly scraped page so it is revalidated later.
+
+        A scrape that finds different content than the tracked hash counts as
+        a change: answers built from the old content are invalidated and the
+        page's interval is shortened, as in revalidate().
+
+        Args:
+            url (str): URL of the page.
+            content_hash (str): Hash of the extracted content.
+            fetched_at (float): Fetch time as a Unix timestamp (defaults to now).
+
+        Returns:
+            bool: True if the page was already tracked with different content.
+        """
+        fetched_at = fetched_at if fetched_at is not None else time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT content_hash, interval FROM pages WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                changed = False
+                self.conn.execute(
+                    "INSERT INTO pages (url, content_hash, last_checked, interval) VALUES (?, ?, ?, ?)",
+                    (url, content_hash, fetched_at, self.initial_interval),
+                )
+            else:
+                old_hash, interval = row
+                changed = content_hash != old_hash
+                if changed:
+                    interval = max(self.min_interval, interval / 2)
+                self.conn.execute(
+                    "UPDATE pages SET content_hash = ?, last_checked = ?, interval = ?, "
+                    "changes = changes + ? WHERE url = ?",
+                    (content_hash, fetched_at, interval, int(changed), url),
+                )
+            self.conn.commit()
+
+        if changed:
+            removed = self.invalidate_answers(url)
+            self.logger.info(
+                f"{url} changed since it was tracked; invalidated {removed} cached answers.")
+        return changed
+
+    def link_answer(self, cache_key, urls):
+        """
+        Record which pages a cached final answer was built from.
+
+        Args:
+            cache_key (str): Key of the cached answer.
+            urls (list): URLs of the pages behind the answer.
+        """
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO answer_pages (cache_key, url) VALUES (?, ?)",
+                [(cache_key, url) for url in urls],
+            )
+            self.conn.commit()
+
+    def due_urls(self, now=None):
+        """
+        List the URLs whose revalidation interval has elapsed, most overdue first.
+
+        Args:
+            now (float): Current Unix timestamp (defaults to now).
+
+        Returns:
+            list: At most fetch_budget URLs.
+        """
+        now = now if now is not None else time.time()
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT url FROM pages WHERE last_checked + interval <= ? "
+                "ORDER BY (? - last_checked) / interval DESC LIMIT ?",
+                (now, now, self.fetch_budget),
+            ).fetchall()
+        return [url for (url,) in rows]
+
+    def invalidate_answers(self, url):
+        """
+        Drop every cached answer that was built from the given page.
+
+        Args:
+            url (str): URL whose content changed.
+
+        Returns:
+            int: Number of cached answers removed.
+        """
+        with self.lock:
+            keys = [key for (key,) in self.conn.execute(
+                "SELECT cache_key FROM answer_pages WHERE url = ?", (url,))]
+            self.conn.executemany(
+                "DELETE FROM answer_pages WHERE cache_key = ?", [(key,) for key in keys])
+            self.conn.commit()
+        for key in keys:
+            self.cache.delete(key)
+        return len(keys)
+
+    def revalidate(self, url):
+        """
+        Refetch a page and adapt its interval to whether its content changed.
+
+        Args:
+            url (str): URL to revalidate.
+
+        Returns:
+            bool: True if the content changed.
+        """
+        scraped = self.web_scraper.scrape_page(url)
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT content_hash, interval FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return False
+        old_hash, interval = row
+
+        # Failed fetches keep the old hash but are pushed back so they cannot
+        # monopolize the fetch budget
+        new_hash = scraped.content_hash
+        if new_hash is None:
+            self.logger.warning(f"Could not revalidate {url}: {scraped.content}")
+            self.record_failure(url, now)
+            return False
+
+        changed = new_hash != old_hash
+        if changed:
+            interval = max(self.min_interval, interval / 2)
+        else:
+            interval = min(self.max_interval, interval * 1.5)
+
+        with self.lock:
+            self.conn.execute(
+                "UPDATE pages SET content_hash = ?, last_checked = ?, interval = ?, "
+                "checks = checks + 1, changes = changes + ?, failures = 0 WHERE url = ?",
+                (new_hash, now, interval, int(changed), url),
+            )
+            self.conn.commit()
+
+        if changed:
+            removed = self.invalidate_answers(url)
+            self.logger.info(
+                f"{url} changed; invalidated {removed} cached answers.")
+            if self.local_index is not None:
+                self.local_index.add_page(
+                    url, scraped.title, urlparse(url).netloc,
+                    scraped.content, fetched_at=now)
+        return changed
+
+    def record_failure(self, url, now=None):
+        """
+        Back off a URL whose revalidation failed, dropping it after max_failures in a row.
+
+        Args:
+            url (str): URL that could not be revalidated.
+            now (float): Current Unix timestamp (defaults to now).
+
+        Returns:
+            bool: True if the URL is no longer tracked.
+        """
+        now = now if now is not None else time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT interval, failures FROM pages WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return True
+            interval, failures = row[0], (row[1] or 0) + 1
+            if failures >= self.max_failures:
+                self.conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+                self.conn.commit()
+                self.logger.info(f"Stopped tracking {url} after {failures} failed revalidations.")
+                return True
+            self.conn.execute(
+                "UPDATE pages SET last_checked = ?, interval = ?, checks = checks + 1, "
+                "failures = ? WHERE url = ?",
+                (now, min(self.max_interval, interval * 2), failures, url),
+            )
+            self.conn.commit()
+        return False
+
+    def run_once(self):
+        """
+        Revalidate the due pages, up to the fetch budget.
+
+        Returns:
+            dict: Numbers of pages checked and changed.
+        """
+        checked = changed = 0
+        for url in self.due_urls():
+            if self.stop_event.is_set():
+                break
+            try:
+                changed += self.revalidate(url)
+            except Exception as e:
+                self.logger.error(f"Error revalidating {url}: {e}")
+                self.record_failure(url)
+            checked += 1
+        return {"checked": checked, "changed": changed}
+
+    def start(self, poll_interval=300):
+        """
+        Run refresh cycles in a background thread.
+
+        Args:
+            poll_interval (float): Seconds to wait between cycles.
+        """
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+
+        def loop():
+            while not self.stop_event.is_set():
+                self.run_once()
+                self.stop_event.wait(poll_interval)
+
+        self.thread = threading.Thread(target=loop, name="RefreshScheduler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stop the background thread after its current fetch.
+        """
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+
+if __name__ == "__main__":
+    from search_and_scrape import SearchAndScrape
+
+    parser = argparse.ArgumentParser(
+        description="Revalidate cached pages and invalidate stale answers.")
+    parser.add_argument("--budget", type=int, default=20,
+                        help="Maximum number of pages to refetch")
+    parser.add_argument("--cache_dir", type=str, default="cache",
+                        help="Cache directory")
+
+    args = parser.parse_args()
+
+    search_and_scrape = SearchAndScrape(cache_dir=args.cache_dir)
+    search_and_scrape.refresh_scheduler.fetch_budget = args.budget
+    print(search_and_scrape.refresh_scheduler.run_once())
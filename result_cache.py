@@ -0,0 +1,273 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import zlib
+import logging
+from diskcache import Cache
+from records import ResultRecord
+
+try:
+    import zstandard
+    ZSTD_INSTALLED = True
+except ImportError:
+    ZSTD_INSTALLED = False
+
+# One-byte codec prefix stored in front of every compressed value
+CODEC_ZLIB = b"z"
+CODEC_ZSTD = b"s"
+
+
+class ResultCache:
+    def __init__(self, cache_dir="cache", size_limit=2 ** 30, compression_level=6):
+        """
+        Initialize the compact cache of search and scrape results.
+
+        Page bodies are stored once, keyed by their sha256, and query entries
+        only reference them. Entries are serialized as JSON and compressed with
+        zstd when available, zlib otherwise.
+
+        Args:
+            cache_dir (str): Directory holding the query entries.
+            size_limit (int): Approximate size cap in bytes for each of the
+                query and body stores; least recently used entries are evicted.
+            compression_level (int): Compression level passed to the codec.
+        """
+        self.cache_dir = cache_dir
+        self.queries = Cache(cache_dir, size_limit=size_limit,
+                             eviction_policy="least-recently-used")
+        self.bodies = Cache(os.path.join(cache_dir, "bodies"), size_limit=size_limit,
+                            eviction_policy="least-recently-used")
+        # Maps original user queries to the reformulated keys of their entries
+        self.aliases = Cache(os.path.join(cache_dir, "aliases"))
+        # Per-page LLM summaries keyed by the sha256 of the page body
+        self.summaries = Cache(os.path.join(cache_dir, "summaries"), size_limit=size_limit,
+                               eviction_policy="least-recently-used")
+        self.compression_level = compression_level
+
+        if ZSTD_INSTALLED:
+            self.compressor = zstandard.ZstdCompressor(level=compression_level)
+            self.decompressor = zstandard.ZstdDecompressor()
+
+        logging.basicConfig(level=logging.INFO,
+                            format="%(asctime)s - %(levelname)s - %(message)s")
+        self.logger = logging.getLogger("ResultCache")
+
+    def _compress(self, raw):
+        if ZSTD_INSTALLED:
+            return CODEC_ZSTD + self.compressor.compress(raw)
+        return CODEC_ZLIB + zlib.compress(raw, self.compression_level)
+
+    def _decompress(self, blob):
+        codec, payload = blob[:1], blob[1:]
+        if codec == CODEC_ZSTD:
+            if not ZSTD_INSTALLED:
+                raise ValueError("Entry is zstd-compressed but zstandard is not installed.")
+            return self.decompressor.decompress(payload)
+        return zlib.decompress(payload)
+
+    def put_body(self, text):
+        """
+        Store a page body once and return its content address.
+
+        Args:
+            text (str): Page body.
+
+        Returns:
+            str: sha256 hex digest of the body.
+        """
+        raw = text.encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        if digest not in self.bodies:
+            self.bodies[digest] = self._compress(raw)
+        return digest
+
+    def get_body(self, digest):
+        """
+        Load a page body by its content address.
+
+        Returns:
+            str: The body, or None if it was evicted.
+        """
+        blob = self.bodies.get(digest)
+        return self._decompress(blob).decode("utf-8") if blob is not None else None
+
+    def __setitem__(self, key, data):
+        results = []
+        for result in data.get("results", []):
+            result = result.to_dict() if isinstance(result, ResultRecord) else dict(result)
+            result["scraped_content"] = {
+                "$body": self.put_body(result.get("scraped_content") or "")}
+            results.append(result)
+        entry = {**data, "results": results}
+        raw = json.dumps(entry, separators=(",", ":")).encode("utf-8")
+        self.queries[key] = self._compress(raw)
+
+    def get(self, key, default=None):
+        """
+        Load a cached entry with its page bodies restored.
+
+        Returns:
+            dict: The cached data with ResultRecord results, or default if
+            missing or a body was evicted.
+        """
+        value = self.queries.get(key)
+        if value is None:
+            return default
+        # Entries written before this format are plain pickled dicts
+        entry = value if isinstance(value, dict) else json.loads(self._decompress(value))
+
+        results = []
+        for result in entry.get("results", []):
+            ref = result.get("scraped_content")
+            if isinstance(ref, dict) and "$body" in ref:
+                body = self.get_body(ref["$body"])
+                if body is None:
+                    return default
+                result = {**result, "scraped_content": body}
+            results.append(ResultRecord.from_dict(result))
+        return {**entry, "results": results}
+
+    def __getitem__(self, key):
+        data = self.get(key)
+        if data is None:
+            raise KeyError(key)
+        return data
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def set_alias(self, query, key):
+        """
+        Remember which entry answers an original (unreformulated) query.
+
+        Args:
+            query (str): Query as typed by the user.
+            key (str): Key of the cached entry.
+        """
+        self.aliases[query] = key
+
+    def get_for_query(self, query):
+        """
+        Load the entry cached for an original query, if any.
+
+        Returns:
+            dict: The cached data, or None.
+        """
+        key = self.aliases.get(query)
+        return self.get(key) if key is not None else None
+
+    def get_summary(self, text):
+        """
+        Load the cached summary of a page body.
+
+        Returns:
+            str: The summary, or None if the body was never summarized.
+        """
+        blob = self.summaries.get(hashlib.sha256(text.encode("utf-8")).hexdigest())
+        return self._decompress(blob).decode("utf-8") if blob is not None else None
+
+    def put_summary(self, text, summary):
+        """
+        Cache the summary of a page body so other queries can reuse it.
+
+        Args:
+            text (str): Page body that was summarized.
+            summary (str): Its summary.
+        """
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        self.summaries[digest] = self._compress(summary.encode("utf-8"))
+
+    def delete(self, key):
+        """
+        Remove a query entry; its bodies are reclaimed by compact().
+        """
+        return self.queries.delete(key)
+
+    def volume(self):
+        """
+        Return the on-disk size of the cache in bytes.
+        """
+        return self.queries.volume() + self.bodies.volume() + self.summaries.volume()
+
+    def compact(self):
+        """
+        Rewrite legacy entries, drop unreferenced bodies and reclaim disk space.
+
+        Returns:
+            dict: Volume before and after compaction and the number of bodies removed.
+        """
+        before = self.volume()
+
+        referenced = set()
+        for key in list(self.queries):
+            value = self.queries.get(key)
+            if isinstance(value, dict):
+                self[key] = value  # Convert legacy pickled entry
+                value = self.queries.get(key)
+            if value is None:
+                continue
+
+            entry = json.loads(self._decompress(value))
+            digests = [result["scraped_content"]["$body"]
+                       for result in entry.get("results", [])]
+            # Entries whose bodies were evicted can never be served again
+            if any(digest not in self.bodies for digest in digests):
+                self.queries.delete(key)
+                continue
+            referenced.update(digests)
+
+        for query in list(self.aliases):
+            if self.aliases.get(query) not in self.queries:
+                self.aliases.delete(query)
+
+        removed = 0
+        for digest in list(self.bodies):
+            if digest not in referenced:
+                self.bodies.delete(digest)
+                removed += 1
+
+        self.queries.cull()
+        self.bodies.cull()
+        self.summaries.cull()
+        for directory in (self.cache_dir, os.path.join(self.cache_dir, "bodies"),
+                          os.path.join(self.cache_dir, "summaries")):
+            conn = sqlite3.connect(os.path.join(directory, "cache.db"))
+            try:
+                conn.execute("VACUUM")
+            finally:
+                conn.close()
+
+        stats = {"volume_before": before, "volume_after": self.volume(), "bodies_removed": removed}
+        self.logger.info(f"Compacted cache: {stats}")
+        return stats
+
+    def close(self):
+        """
+        Close the underlying stores.
+        """
+        self.queries.close()
+        self.bodies.close()
+        self.aliases.close()
+        self.summaries.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Inspect or compact the search and scrape result cache.")
+    parser.add_argument("--cache_dir", type=str, default="cache",
+                        help="Cache directory")
+    parser.add_argument("--compact", action="store_true",
+                        help="Rewrite legacy entries, drop unreferenced bodies and vacuum")
+
+    args = parser.parse_args()
+
+    cache = ResultCache(args.cache_dir)
+    if args.compact:
+        print(json.dumps(cache.compact(), indent=4))
+    else:
+        print(f"Query entries: {len(cache.queries)}")
+        print(f"Page bodies: {len(cache.bodies)}")
+        print(f"Volume: {cache.volume()} bytes")
+    cache.close()
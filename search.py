@@ -1,18 +1,109 @@
-from duckduckgo_search import DDGS
-from typing import List, Dict, Optional
+import re
+from typing import List, Dict, Optional, Tuple
+from records import SearchHit
+
+
+class KeywordMatcher:
+    def __init__(self, keywords: List[str], whole_words: bool = False):
+        """
+        Compile a list of keywords into a single case-insensitive, trie-shaped regex.
+
+        Keywords sharing a prefix share a branch of the pattern, so at each
+        text position the regex engine follows at most one branch per
+        character instead of trying every keyword in turn. Multi-word keywords
+        are matched as phrases, allowing any run of whitespace between their
+        words.
+
+        Args:
+            keywords (List[str]): Keywords or phrases to match.
+            whole_words (bool): Only match keywords not directly preceded or
+                followed by a word character.
+        """
+        self.keywords = [kw.strip() for kw in keywords if kw and kw.strip()]
+        self.whole_words = whole_words
+
+        trie: Dict[str, dict] = {}
+        for keyword in self.keywords:
+            node = trie
+            # A single space stands for "any whitespace" between phrase words
+            for char in " ".join(keyword.lower().split()):
+                node = node.setdefault(char, {})
+            node[""] = {}
+
+        if not trie:
+            self.pattern = None
+        elif whole_words:
+            # Lookarounds rather than \b so keywords like "c++" still match
+            self.pattern = re.compile(
+                r"(?<!\w)(?:" + self._trie_pattern(trie) + r")(?!\w)", re.IGNORECASE)
+        else:
+            self.pattern = re.compile(self._trie_pattern(trie), re.IGNORECASE)
+
+    @classmethod
+    def _trie_pattern(cls, node: Dict[str, dict]) -> str:
+        """
+        Render a trie node as a regex, preferring the longest match.
+        """
+        branches = [
+            (r"\s+" if char == " " else re.escape(char)) + cls._trie_pattern(child)
+            for char, child in node.items()
+            if char
+        ]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            # A keyword ends here; the rest of the branch is optional
+            pattern = pattern if len(branches) > 1 else "(?:" + pattern + ")"
+            pattern += "?"
+        return pattern
+
+    def matches(self, *texts: str) -> bool:
+        """
+        Check whether any keyword occurs in any of the given texts.
+
+        Args:
+            texts (str): Texts to scan.
+
+        Returns:
+            bool: True if at least one keyword matched.
+        """
+        if self.pattern is None:
+            return False
+        return any(text and self.pattern.search(text) for text in texts)
 
 
 class SearchModule:
-    def __init__(self, max_results: int = 5, default_time_range: str = "none"):
+    def __init__(self, max_results: int = 5, default_time_range: str = "none", whole_words: bool = False):
         """
         Initialize the SearchModule.
 
         Args:
             max_results (int): The maximum number of search results to return.
             default_time_range (str): Default time range for searches ('d', 'w', 'm', 'y', 'none').
+            whole_words (bool): Match include/exclude keywords on word boundaries only.
         """
         self.max_results = max_results
         self.default_time_range = default_time_range
+        self.whole_words = whole_words
+        self._matchers: Dict[Tuple[Tuple[str, ...], bool], KeywordMatcher] = {}
+
+    def _get_matcher(self, keywords: List[str]) -> KeywordMatcher:
+        """
+        Return a compiled matcher for the keywords, reusing earlier compilations.
+
+        Args:
+            keywords (List[str]): Keywords to match.
+
+        Returns:
+            KeywordMatcher: The compiled matcher.
+        """
+        key = (tuple(keywords), self.whole_words)
+        matcher = self._matchers.get(key)
+        if matcher is None:
+            matcher = KeywordMatcher(keywords, whole_words=self.whole_words)
+            self._matchers[key] = matcher
+        return matcher
 
     def search(
         self,
@@ -20,7 +111,7 @@ class SearchModule:
         time_range: Optional[str] = None,
         include_keywords: Optional[List[str]] = None,
         exclude_keywords: Optional[List[str]] = None,
-    ) -> List[Dict[str, str]]:
+    ) -> List[SearchHit]:
         """
         Perform a web search using DuckDuckGo.
 
@@ -31,11 +122,14 @@ class SearchModule:
             exclude_keywords (Optional[List[str]]): Keywords to exclude from the results.
 
         Returns:
-            list: A list of filtered search results with title, link, and snippet.
+            list: A list of filtered SearchHit records with title, link, and snippet.
         """
         time_range = time_range or self.default_time_range
 
         try:
+            # Imported lazily so cached answers never load the search stack
+            from duckduckgo_search import DDGS
+
             with DDGS() as ddgs:
                 results = ddgs.text(
                     query, timelimit=time_range, max_results=self.max_results
@@ -46,11 +140,11 @@ class SearchModule:
                     exclude_keywords=exclude_keywords,
                 )
                 return [
-                    {
-                        "title": result.get("title", "No Title"),
-                        "link": result.get("href", "No Link"),
-                        "snippet": result.get("body", "No Snippet"),
-                    }
+                    SearchHit(
+                        title=result.get("title", "No Title"),
+                        link=result.get("href", "No Link"),
+                        snippet=result.get("body", "No Snippet"),
+                    )
                     for result in filtered_results
                 ]
         except Exception as e:
@@ -74,24 +168,20 @@ class SearchModule:
         Returns:
             list: The filtered search results.
         """
+        include = self._get_matcher(include_keywords) if include_keywords else None
+        exclude = self._get_matcher(exclude_keywords) if exclude_keywords else None
         filtered_results = []
 
         for result in results:
-            title = result.get("title", "").lower()
-            snippet = result.get("body", "").lower()
+            title = result.get("title", "")
+            snippet = result.get("body", "")
 
             # Include filter
-            if include_keywords and not any(
-                keyword.lower() in title or keyword.lower() in snippet
-                for keyword in include_keywords
-            ):
+            if include and include.pattern and not include.matches(title, snippet):
                 continue
 
             # Exclude filter
-            if exclude_keywords and any(
-                keyword.lower() in title or keyword.lower() in snippet
-                for keyword in exclude_keywords
-            ):
+            if exclude and exclude.matches(title, snippet):
                 continue
 
             filtered_results.append(result)
@@ -124,8 +214,8 @@ if __name__ == "__main__":
         print("\nSearch Results:")
         for i, result in enumerate(results, 1):
             print(f"\nResult {i}:")
-            print(f"Title: {result['title']}")
-            print(f"Link: {result['link']}")
-            print(f"Snippet: {result['snippet']}")
+            print(f"Title: {result.title}")
+            print(f"Link: {result.link}")
+            print(f"Snippet: {result.snippet}")
     else:
         print("No results found.")
@@ -1,18 +1,36 @@
 import argparse
 import json
 import csv
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
 from rich.console import Console
-from rich.table import Table
-from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn
-from diskcache import Cache
 from search import SearchModule
 from web_scraper import WebScraper
 from ollama import LLMIntegration
+from local_index import LocalIndex
+from refresh_scheduler import RefreshScheduler
+from result_cache import ResultCache
+from exporter import StreamingExporter
+from records import ResultRecord
+
+# Stand-ins stored as scraped_content when a page yielded no text of its own
+PLACEHOLDER_CONTENT = {"No content scraped.", "No main content found.", "Access denied by robots.txt"}
+
+
+def is_placeholder(content):
+    """
+    Check whether scraped content is a stand-in for a page that failed to scrape.
+    """
+    return not content or content in PLACEHOLDER_CONTENT or content.startswith("Failed to fetch ")
 
 
 class SearchAndScrape:
-    def __init__(self, max_results=5, cache_dir="cache", llm_model="llama3.1:latest"):
+    def __init__(self, max_results=5, cache_dir="cache", llm_model="llama3.1:latest", min_local_results=3, min_term_fraction=0.75,
+                 cache_size_limit=2 ** 30, answer_mode="concat", llm_concurrency=4, top_k=8,
+                 embedding_model="nomic-embed-text", llm_priority="interactive", llm_batching=False):
         """
         Initialize the SearchAndScrape tool.
 
@@ -20,14 +38,46 @@ class SearchAndScrape:
             max_results (int): Maximum number of search results to fetch.
             cache_dir (str): Directory to store cached results.
             llm_model (str): Model to use with the LLM integration.
+            min_local_results (int): Minimum local index hits needed to answer without the web.
+            min_term_fraction (float): Fraction of non-stopword query terms a local page
+                must contain to count as a hit.
+            cache_size_limit (int): Approximate size cap in bytes for the result cache.
+            answer_mode (str): 'concat' sends all page text in one prompt; 'map_reduce'
+                summarizes each page in parallel and answers from the summaries;
+                'retrieval' sends only the passages most similar to the query.
+            llm_concurrency (int): Maximum concurrent per-page summarization calls.
+            top_k (int): Number of passages selected in retrieval mode.
+            embedding_model (str): Ollama model used for passage embeddings.
+            llm_priority (str): Dispatcher queue for query reformulation ('interactive' or 'batch');
+                per-page summaries always go to the batch queue.
+            llm_batching (bool): Micro-batch concurrent LLM calls through LLMIntegration's dispatcher.
         """
+        self.max_results = max_results
+        self.answer_mode = answer_mode
+        self.llm_concurrency = llm_concurrency
+        self.top_k = top_k
+        self.cache_dir = cache_dir
+        self.vector_index = None
+        self.min_local_results = min_local_results
+        self.min_term_fraction = min_term_fraction
         self.search_module = SearchModule(max_results=max_results)
         self.web_scraper = WebScraper()
-        self.llm = LLMIntegration(model=llm_model)
+        self.llm = LLMIntegration(model=llm_model, embedding_model=embedding_model)
+        self.llm_priority = llm_priority
+        if llm_batching:
+            self.llm.enable_batching(num_parallel=llm_concurrency)
         self.console = Console()
-        self.cache = Cache(cache_dir)
+        self.cache = ResultCache(cache_dir, size_limit=cache_size_limit)
+        self.local_index = LocalIndex(os.path.join(cache_dir, "index.db"))
+        self.refresh_scheduler = RefreshScheduler(
+            self.web_scraper,
+            self.cache,
+            os.path.join(cache_dir, "refresh.db"),
+            local_index=self.local_index,
+        )
 
-    def search_and_scrape(self, query, skip_restricted=True, time_range=None, include_keywords=None, exclude_keywords=None):
+    def search_and_scrape(self, query, skip_restricted=True, time_range=None, include_keywords=None, exclude_keywords=None,
+                          offline_first=False, exporter=None):
         """
         Perform a search and scrape operation.
 
@@ -37,22 +87,44 @@ class SearchAndScrape:
             time_range (str): Time range for search ('d', 'w', 'm', 'y', 'none').
             include_keywords (list): Keywords to include in search results.
             exclude_keywords (list): Keywords to exclude from search results.
+            offline_first (bool): Answer from the local index when it has enough matches.
+            exporter (StreamingExporter): Optional exporter receiving each result as soon as it is
+                scraped, or all results at once when they come from the cache or local index.
 
         Returns:
             dict: Results and final answer.
         """
         self.console.print(f"[cyan]Original Query: {query}[/cyan]")
 
+        # Repeated queries are served from the cache without an LLM round trip
+        cached_data = self.cache.get_for_query(query)
+        if cached_data is not None:
+            self.console.print(
+                "[green]Loaded cached results for query.[/green]")
+            self.stream_results(exporter, query, cached_data)
+            return cached_data
+
         # Reformulate query using LLM
-        reformulated_query = self.llm.reformulate_query(query)
+        reformulated_query = self.llm.reformulate_query(
+            query, priority=self.llm_priority)
         self.console.print(f"[cyan]Reformulated Query: {
                            reformulated_query}[/cyan]")
 
         # Check cache
-        if reformulated_query in self.cache:
+        cached_data = self.cache.get(reformulated_query)
+        if cached_data is not None:
             self.console.print(
                 "[green]Loaded cached results for query.[/green]")
-            return self.cache[reformulated_query]
+            self.cache.set_alias(query, reformulated_query)
+            self.stream_results(exporter, query, cached_data)
+            return cached_data
+
+        # Answer from previously scraped pages when the local index has enough recall
+        if offline_first:
+            local_data = self.answer_from_local_index(query)
+            if local_data:
+                self.stream_results(exporter, query, local_data)
+                return local_data
 
         # Perform search
         search_results = self.search_module.search(
@@ -67,8 +139,9 @@ class SearchAndScrape:
             self.console.print("[red]No search results found.[/red]")
             return {"results": [], "final_answer": None}
 
-        # Scrape URLs
-        urls = [result["link"] for result in search_results]
+        from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn
+
+        # Scrape URLs and compile results as each page completes
         combined_results = []
 
         with Progress(
@@ -79,44 +152,241 @@ class SearchAndScrape:
             console=self.console,
         ) as progress:
             scrape_task = progress.add_task(
-                "Scraping URLs...", total=len(urls))
-            scraped_data = {}
+                "Scraping URLs...", total=len(search_results))
 
-            for url in urls:
+            for hit in search_results:
+                url = hit.link
+                page = None
                 try:
-                    scraped_data[url] = self.web_scraper.scrape_page(url)
+                    page = self.web_scraper.scrape_page(url)
+                    self.index_page(url, page)
                 except Exception as e:
                     self.console.print(f"[red]Error scraping {url}: {e}[/red]")
                 progress.advance(scrape_task)
 
-        # Compile results
-        for result in search_results:
-            url = result["link"]
-            scraped_content = scraped_data.get(url, {})
-            if skip_restricted and "Access denied by robots.txt" in scraped_content.get("content", ""):
-                self.console.print(
-                    f"[yellow]Skipped restricted page: {url}[/yellow]")
-                continue
+                if skip_restricted and page and "Access denied by robots.txt" in page.content:
+                    self.console.print(
+                        f"[yellow]Skipped restricted page: {url}[/yellow]")
+                    continue
 
-            combined_results.append({
-                "title": result["title"],
-                "snippet": result["snippet"],
-                "link": url,
-                "scraped_content": scraped_content.get("content", "No content scraped."),
-                "source": urlparse(url).netloc,
-            })
+                record = ResultRecord(
+                    title=hit.title,
+                    snippet=hit.snippet,
+                    link=url,
+                    scraped_content=page.content if page else "No content scraped.",
+                    source=urlparse(url).netloc,
+                )
+                combined_results.append(record)
+                if exporter is not None:
+                    exporter.write({"query": query, **record.to_dict()})
 
         # Generate final answer
-        scraped_text = " ".join([res["scraped_content"]
-                                for res in combined_results])
-        self.console.print("[cyan]Generating final answer using LLM...[/cyan]")
-        final_answer = self.llm.generate_final_answer(query, scraped_text)
+        final_answer = self.generate_answer(query, combined_results)
 
         # Cache results
         data = {"results": combined_results, "final_answer": final_answer}
         self.cache[reformulated_query] = data
+        self.cache.set_alias(query, reformulated_query)
+        self.refresh_scheduler.link_answer(
+            reformulated_query, [res.link for res in combined_results])
         return data
 
+    def stream_results(self, exporter, query, data):
+        """
+        Write every result of an answer that was not scraped just now to the exporter.
+
+        Args:
+            exporter (StreamingExporter): Exporter to write to, or None.
+            query (str): User's search query.
+            data (dict): Results and final answer.
+        """
+        if exporter is None:
+            return
+        for record in data.get("results", []):
+            exporter.write({"query": query, **record.to_dict()})
+
+    def index_page(self, url, page):
+        """
+        Add a successfully scraped page to the local full-text index and
+        schedule it for revalidation.
+
+        Args:
+            url (str): URL of the scraped page.
+            page (PageContent): Output of WebScraper.scrape_page.
+        """
+        # Only extract_content results carry a content hash; failures do not
+        if page.content_hash is None:
+            return
+        fetched_at = time.time()
+        self.local_index.add_page(
+            url,
+            page.title,
+            urlparse(url).netloc,
+            page.content,
+            fetched_at=fetched_at,
+        )
+        self.refresh_scheduler.track(
+            url, page.content_hash, fetched_at=fetched_at)
+
+    def answer_from_local_index(self, query):
+        """
+        Build results and a final answer from the local index only.
+
+        Args:
+            query (str): User's search query.
+
+        Returns:
+            dict: Results and final answer, or None if the index has too few matches.
+        """
+        pages = self.local_index.search(
+            query, limit=self.max_results, min_term_fraction=self.min_term_fraction)
+        if len(pages) < self.min_local_results:
+            self.console.print(
+                f"[yellow]Local index returned {len(pages)} pages; searching the web.[/yellow]")
+            return None
+
+        self.console.print(
+            f"[green]Answering from {len(pages)} locally indexed pages.[/green]")
+        combined_results = [
+            ResultRecord(
+                title=page["title"],
+                snippet=page["content"][:200],
+                link=page["url"],
+                scraped_content=page["content"],
+                source=page["source"],
+            )
+            for page in pages
+        ]
+        final_answer = self.generate_answer(query, combined_results)
+        return {"results": combined_results, "final_answer": final_answer}
+
+    def generate_answer(self, query, combined_results):
+        """
+        Generate the final answer from compiled results using the configured answer mode.
+
+        Args:
+            query (str): User's search query.
+            combined_results (list): ResultRecord results with scraped content.
+
+        Returns:
+            str: The final answer.
+        """
+        if self.answer_mode == "retrieval":
+            passages = self.select_passages(query, combined_results)
+            if passages is not None:
+                self.console.print(
+                    f"[cyan]Generating final answer from {len(passages)} passages using LLM...[/cyan]")
+                return self.llm.generate_final_answer(query, "\n\n".join(passages))
+            self.console.print(
+                "[yellow]Passage retrieval unavailable; using full page text.[/yellow]")
+
+        if self.answer_mode == "map_reduce":
+            summaries = [summary for summary in self.summarize_pages(combined_results) if summary]
+            if summaries:
+                self.console.print(
+                    f"[cyan]Combining {len(summaries)} page summaries using LLM...[/cyan]")
+                return self.llm.combine_summaries(query, summaries)
+            self.console.print(
+                "[yellow]No page summaries available; using full page text.[/yellow]")
+
+        scraped_text = " ".join(res.scraped_content
+                                for res in combined_results)
+        self.console.print("[cyan]Generating final answer using LLM...[/cyan]")
+        return self.llm.generate_final_answer(query, scraped_text)
+
+    def select_passages(self, query, combined_results):
+        """
+        Pick the passages most similar to the query across the scraped pages.
+
+        Passages are embedded once and kept in a memory-mapped index keyed by
+        passage hash, so only passages never seen before cost an embedding call.
+
+        Args:
+            query (str): User's search query.
+            combined_results (list): ResultRecord results with scraped content.
+
+        Returns:
+            list: Up to top_k passages, best first, or None if embeddings are unavailable.
+        """
+        from vector_index import NUMPY_INSTALLED, VectorIndex, split_passages
+
+        if not NUMPY_INSTALLED:
+            self.console.print("[yellow]numpy is not installed.[/yellow]")
+            return None
+        if self.vector_index is None:
+            # Embeddings from different models are not comparable, so each model gets its own index
+            model_dir = re.sub(r"[^\w.-]+", "_", self.llm.embedding_model)
+            try:
+                self.vector_index = VectorIndex(
+                    os.path.join(self.cache_dir, "vectors", model_dir),
+                    model=self.llm.embedding_model)
+            except ValueError as e:
+                self.console.print(f"[yellow]{e}[/yellow]")
+                return None
+
+        passages = {}
+        for res in combined_results:
+            for text in split_passages(res.scraped_content):
+                passages.setdefault(VectorIndex.passage_hash(text), (res.link, text))
+        rows = self.vector_index.rows_for(passages)
+
+        missing = [digest for digest in passages if digest not in rows]
+        self.console.print(
+            f"[cyan]Embedding {len(missing)} passages "
+            f"({len(rows)} cached)...[/cyan]")
+        texts = [passages[digest][1] for digest in missing]
+        vectors = self.llm.embed(texts + [query])
+        if vectors is None:
+            return None
+        try:
+            if missing:
+                rows.update(self.vector_index.add(
+                    [passages[digest] for digest in missing], vectors[:-1]))
+            best = self.vector_index.top_k(vectors[-1], list(rows.values()), k=self.top_k)
+        except ValueError as e:
+            # Raised when the embeddings do not match the dimension of the index
+            self.console.print(f"[yellow]{e}[/yellow]")
+            return None
+        return [text for _, _, text in best]
+
+    def summarize_pages(self, combined_results):
+        """
+        Summarize each page with the LLM in parallel, reusing cached summaries.
+
+        Summaries are cached by page content, so any later query that
+        scrapes the same page only pays for the reduce step. With batching
+        enabled they are queued as batch work, so interactive requests such as
+        another query's reformulation go out first.
+
+        Args:
+            combined_results (list): ResultRecord results with scraped content.
+
+        Returns:
+            list: One summary per result (None where summarization failed or
+            the page could not be scraped).
+        """
+        contents = [res.scraped_content for res in combined_results]
+        # Fetch failures have nothing to summarize; skip them before the map step
+        summaries = [None if is_placeholder(content) else self.cache.get_summary(content)
+                     for content in contents]
+        missing = [i for i, summary in enumerate(summaries)
+                   if summary is None and not is_placeholder(contents[i])]
+        cached = sum(summary is not None for summary in summaries)
+        self.console.print(
+            f"[cyan]Summarizing {len(missing)} pages "
+            f"({cached} cached, {len(contents) - len(missing) - cached} not scraped)...[/cyan]")
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=self.llm_concurrency) as executor:
+                fresh = executor.map(
+                    lambda content: self.llm.analyze_content(content, priority="batch"),
+                    [contents[i] for i in missing])
+                for i, summary in zip(missing, fresh):
+                    summaries[i] = summary
+                    if summary:
+                        self.cache.put_summary(contents[i], summary)
+        return summaries
+
     def display_results(self, data):
         """
         Display search results and the final answer.
@@ -124,6 +394,8 @@ class SearchAndScrape:
         Args:
             data (dict): Search results and final answer.
         """
+        from rich.table import Table
+
         results = data.get("results", [])
         final_answer = data.get("final_answer", "No final answer generated.")
 
@@ -134,36 +406,47 @@ class SearchAndScrape:
         table.add_column("Source", style="magenta")
 
         for result in results:
-            table.add_row(result["title"], result["snippet"], result["source"])
+            table.add_row(result.title, result.snippet, result.source)
 
         self.console.print(table)
         self.console.print(
             f"[bold green]Final Answer:[/bold green] {final_answer}")
 
-    def export_results(self, data, output_format="json"):
+    def export_results(self, data, output_format="json", output_path=None, query=None):
         """
         Export results to a file.
 
         Args:
             data (dict): Results to export.
-            output_format (str): Format for export ('json' or 'csv').
+            output_format (str): Format for export ('json', 'csv' or 'jsonl').
+            output_path (str): Output file (defaults to search_and_scrape_results.<format>).
+            query (str): Query the results answer, added to every JSONL record like
+                the records written by StreamingExporter during scraping.
         """
+        output_path = output_path or f"search_and_scrape_results.{output_format}"
+        results = [result.to_dict() for result in data.get("results", [])]
         if output_format == "json":
-            with open("search_and_scrape_results.json", "w") as f:
-                json.dump(data, f, indent=4)
+            with open(output_path, "w") as f:
+                json.dump({**data, "results": results}, f, indent=4)
             self.console.print(
-                "[green]Results exported to search_and_scrape_results.json[/green]")
+                f"[green]Results exported to {output_path}[/green]")
         elif output_format == "csv":
-            with open("search_and_scrape_results.csv", "w", newline="") as f:
+            with open(output_path, "w", newline="") as f:
                 writer = csv.DictWriter(
-                    f, fieldnames=["title", "snippet", "link", "source"])
+                    f, fieldnames=["title", "snippet", "link", "source"], extrasaction="ignore")
                 writer.writeheader()
-                writer.writerows(data.get("results", []))
+                writer.writerows(results)
+            self.console.print(
+                f"[green]Results exported to {output_path}[/green]")
+        elif output_format == "jsonl":
+            with StreamingExporter(output_path, output_format="jsonl") as exporter:
+                for result in results:
+                    exporter.write({"query": query, **result})
             self.console.print(
-                "[green]Results exported to search_and_scrape_results.csv[/green]")
+                f"[green]Results appended to {output_path}[/green]")
         else:
             self.console.print(
-                "[red]Unsupported format. Use 'json' or 'csv'.[/red]")
+                "[red]Unsupported format. Use 'json', 'csv' or 'jsonl'.[/red]")
 
 
 if __name__ == "__main__":
@@ -179,7 +462,17 @@ if __name__ == "__main__":
     parser.add_argument("--exclude", type=str,
                         help="Comma-separated keywords to exclude from results")
     parser.add_argument("--export", type=str, default="json",
-                        choices=["json", "csv"], help="Export format for results")
+                        choices=["json", "csv", "jsonl"], help="Export format for results")
+    parser.add_argument("--output", type=str,
+                        help="Export file path (default: search_and_scrape_results.<format>)")
+    parser.add_argument("--offline_first", action="store_true",
+                        help="Answer from the local page index before searching the web")
+    parser.add_argument("--answer_mode", type=str, default="concat",
+                        choices=["concat", "map_reduce", "retrieval"], help="How the final answer is generated")
+    parser.add_argument("--llm_batching", action="store_true",
+                        help="Route LLM calls through the micro-batching dispatcher")
+    parser.add_argument("--llm_priority", type=str, default="interactive",
+                        choices=["interactive", "batch"], help="Dispatcher queue for query reformulation")
 
     args = parser.parse_args()
 
@@ -188,14 +481,18 @@ if __name__ == "__main__":
     exclude_keywords = [kw.strip() for kw in args.exclude.split(
         ",")] if args.exclude else None
 
-    search_and_scrape = SearchAndScrape(max_results=args.re)
+    search_and_scrape = SearchAndScrape(
+        max_results=args.re, answer_mode=args.answer_mode,
+        llm_batching=args.llm_batching, llm_priority=args.llm_priority)
     data = search_and_scrape.search_and_scrape(
         query=args.query,
         time_range=args.time_range,
         include_keywords=include_keywords,
         exclude_keywords=exclude_keywords,
+        offline_first=args.offline_first,
     )
 
     if data.get("results"):
         search_and_scrape.display_results(data)
-        search_and_scrape.export_results(data, output_format=args.export)
+        search_and_scrape.export_results(
+            data, output_format=args.export, output_path=args.output, query=args.query)
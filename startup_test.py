@@ -0,0 +1,56 @@
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ["duckduckgo_search", "bs4", "requests",
+                 "playwright", "rich.table", "rich.progress"]
+
+
+def time_command(args, runs=5):
+    """
+    Run a Python command several times and return the best wall-clock time.
+    """
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], capture_output=True, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def loaded_heavy_modules(module):
+    """
+    Import a module in a fresh interpreter and list the heavy dependencies it loaded.
+    """
+    code = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    output = subprocess.run([sys.executable, "-c", code],
+                            capture_output=True, text=True, check=True).stdout.strip()
+    return [m for m in output.split(",") if m]
+
+
+def main():
+    print("\n--- Test 1: Import time ---")
+    baseline = time_command(["-c", "pass"])
+    print(f"Bare interpreter: {baseline * 1000:.1f} ms")
+    for module in ["search", "web_scraper", "ollama", "search_and_scrape"]:
+        elapsed = time_command(["-c", f"import {module}"])
+        print(f"import {module}: {(elapsed - baseline) * 1000:.1f} ms")
+
+    print("\n--- Test 2: CLI startup ---")
+    elapsed = time_command(["main.py", "--help"])
+    print(f"main.py --help: {(elapsed - baseline) * 1000:.1f} ms")
+
+    print("\n--- Test 3: Heavy dependencies loaded at import ---")
+    for module in ["main", "search_and_scrape"]:
+        heavy = loaded_heavy_modules(module)
+        if heavy:
+            print(f"import {module} loaded: {', '.join(heavy)}")
+        else:
+            print(f"import {module} loaded no heavy dependencies.")
+
+
+if __name__ == "__main__":
+    main()
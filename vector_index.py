@@ -0,0 +1,200 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import logging
+
+try:
+    import numpy as np
+    NUMPY_INSTALLED = True
+except ImportError:
+    NUMPY_INSTALLED = False
+
+
+def split_passages(text, passage_words=80, overlap_words=20):
+    """
+    Split text into overlapping passages of roughly equal word count.
+
+    Args:
+        text (str): Text to split.
+        passage_words (int): Words per passage.
+        overlap_words (int): Words shared by consecutive passages.
+
+    Returns:
+        list: Passages in document order.
+    """
+    words = text.split()
+    if len(words) <= passage_words:
+        return [" ".join(words)] if words else []
+    step = max(1, passage_words - overlap_words)
+    return [" ".join(words[start:start + passage_words])
+            for start in range(0, len(words) - overlap_words, step)]
+
+
+class VectorIndex:
+    def __init__(self, index_dir="cache/vectors", model=None):
+        """
+        Initialize the memory-mapped passage embedding index.
+
+        Vectors are L2-normalized float32 rows appended to a flat file and
+        memory-mapped for search, so cosine similarity is a single matrix
+        product. Passage metadata and the row of each passage hash live in
+        SQLite, so a passage is only ever embedded once.
+
+        Vectors from different embedding models are not comparable, so the
+        index records the model it was built with and refuses any other.
+
+        Args:
+            index_dir (str): Directory holding vectors.f32 and passages.db.
+            model (str): Name of the embedding model the vectors come from.
+        """
+        if not NUMPY_INSTALLED:
+            raise ImportError("numpy is required for the vector index.")
+        os.makedirs(index_dir, exist_ok=True)
+        self.vectors_path = os.path.join(index_dir, "vectors.f32")
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(index_dir, "passages.db"), check_same_thread=False)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS passages (
+                row INTEGER PRIMARY KEY,
+                hash TEXT UNIQUE,
+                url TEXT,
+                text TEXT
+            );
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            """
+        )
+        self.conn.commit()
+        meta = dict(self.conn.execute("SELECT key, value FROM meta"))
+        self.dim = int(meta["dim"]) if "dim" in meta else None
+        self.model = model
+        if model is not None:
+            if "model" not in meta:
+                self.conn.execute("INSERT INTO meta (key, value) VALUES ('model', ?)", (model,))
+                self.conn.commit()
+            elif meta["model"] != model:
+                self.conn.close()
+                raise ValueError(
+                    f"Index {index_dir} holds embeddings from {meta['model']}, not {model}.")
+        self.vectors = None
+
+        logging.basicConfig(level=logging.INFO,
+                            format="%(asctime)s - %(levelname)s - %(message)s")
+        self.logger = logging.getLogger("VectorIndex")
+
+    @staticmethod
+    def passage_hash(text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _mapped(self):
+        # Remap lazily; appends invalidate the current mapping
+        if self.vectors is None and self.dim and os.path.exists(self.vectors_path):
+            rows = os.path.getsize(self.vectors_path) // (4 * self.dim)
+            if rows:
+                self.vectors = np.memmap(self.vectors_path, dtype=np.float32,
+                                         mode="r", shape=(rows, self.dim))
+        return self.vectors
+
+    def rows_for(self, hashes):
+        """
+        Look up the rows of already embedded passages.
+
+        Args:
+            hashes (list): Passage hashes.
+
+        Returns:
+            dict: Row number per known hash.
+        """
+        found = {}
+        hashes = list(hashes)
+        with self.lock:
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(self.conn.execute(
+                    f"SELECT hash, row FROM passages WHERE hash IN ({placeholders})", chunk))
+        return found
+
+    def add(self, passages, vectors):
+        """
+        Append embedded passages to the index.
+
+        Args:
+            passages (list): (url, text) pairs.
+            vectors (list): One embedding per passage.
+
+        Returns:
+            dict: Row number per passage hash.
+        """
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim != 2 or len(matrix) != len(passages):
+            raise ValueError("Expected one embedding per passage.")
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+
+        with self.lock:
+            if self.dim is None:
+                self.dim = matrix.shape[1]
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('dim', ?)", (str(self.dim),))
+            elif matrix.shape[1] != self.dim:
+                raise ValueError(
+                    f"Embedding dimension {matrix.shape[1]} does not match index dimension {self.dim}.")
+
+            start = (os.path.getsize(self.vectors_path) // (4 * self.dim)
+                     if os.path.exists(self.vectors_path) else 0)
+            with open(self.vectors_path, "ab") as f:
+                f.write(matrix.tobytes())
+            rows = {}
+            for offset, (url, text) in enumerate(passages):
+                digest = self.passage_hash(text)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO passages (row, hash, url, text) VALUES (?, ?, ?, ?)",
+                    (start + offset, digest, url, text))
+                rows[digest] = start + offset
+            self.conn.commit()
+            self.vectors = None
+        return rows
+
+    def top_k(self, query_vector, rows, k=8):
+        """
+        Select the passages most similar to a query by cosine similarity.
+
+        Args:
+            query_vector (list): Embedding of the query.
+            rows (list): Candidate rows to rank.
+            k (int): Number of passages to return.
+
+        Returns:
+            list: (score, url, text) tuples, best first.
+        """
+        vectors = self._mapped()
+        if vectors is None or not rows:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        if query.shape != (self.dim,):
+            raise ValueError(
+                f"Query embedding dimension {query.size} does not match index dimension {self.dim}.")
+        query /= np.linalg.norm(query) or 1
+
+        rows = np.fromiter(sorted(set(rows)), dtype=np.int64)
+        scores = vectors[rows] @ query
+        k = min(k, len(rows))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+
+        results = []
+        with self.lock:
+            for i in best:
+                url, text = self.conn.execute(
+                    "SELECT url, text FROM passages WHERE row = ?", (int(rows[i]),)).fetchone()
+                results.append((float(scores[i]), url, text))
+        return results
+
+    def close(self):
+        """
+        Close the metadata database.
+        """
+        with self.lock:
+            self.conn.close()
@@ -1,15 +1,29 @@
-import requests
-from bs4 import BeautifulSoup
-from urllib.robotparser import RobotFileParser
+from importlib.util import find_spec
 from urllib.parse import urljoin, urlparse
+import codecs
+import re
 import time
+import hashlib
 import logging
+from records import PageContent
 
-try:
-    from playwright.sync_api import sync_playwright
-    PLAYWRIGHT_INSTALLED = True
-except ImportError:
-    PLAYWRIGHT_INSTALLED = False
+# requests, bs4, playwright and urllib.robotparser (which pulls in
+# urllib.request) are imported where they are used so that
+# importing this module stays cheap for callers that only hit the cache.
+PLAYWRIGHT_INSTALLED = find_spec("playwright") is not None
+
+CHARSET_HEADER_RE = re.compile(r"charset\s*=\s*[\"']?\s*([\w.:-]+)", re.IGNORECASE)
+CHARSET_META_RE = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?\s*([\w.:-]+)", re.IGNORECASE)
+BOMS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+# Browsers treat these labels as windows-1252, a superset of them
+WINDOWS_1252_ALIASES = {"ascii", "latin-1", "iso8859-1"}
+# Statistical guesses below these thresholds fall back to windows-1252
+MIN_DETECT_CONFIDENCE = 0.8  # chardet confidence
+MAX_DETECT_CHAOS = 0.1  # charset_normalizer mess ratio
 
 
 class WebScraper:
@@ -19,7 +33,8 @@ class WebScraper:
                  timeout=10,
                  max_retries=3,
                  enable_js=False,
-                 summarize_content=True):
+                 summarize_content=True,
+                 max_links=10):
         """
         Initialize the WebScraper.
 
@@ -30,14 +45,17 @@ class WebScraper:
             max_retries (int): Maximum number of retries for a failed request.
             enable_js (bool): Enable JavaScript rendering (requires Playwright).
             summarize_content (bool): Summarize long scraped content.
+            max_links (int): Maximum number of links to return per page.
         """
         self.user_agent = user_agent
         self.rate_limit = rate_limit
         self.timeout = timeout
         self.max_retries = max_retries
         self.summarize_content = summarize_content
+        self.max_links = max_links
         self.enable_js = enable_js and PLAYWRIGHT_INSTALLED
         self.last_request_time = {}
+        self.robots_cache = {}
 
         # Set up logging
         logging.basicConfig(level=logging.INFO,
@@ -52,17 +70,24 @@ class WebScraper:
     def can_fetch(self, url):
         """
         Check if the URL can be scraped based on robots.txt.
+        Parsed robots.txt files are cached per domain.
         """
         parsed_url = urlparse(url)
         robots_url = f"{parsed_url.scheme}://{parsed_url.netloc}/robots.txt"
-        rp = RobotFileParser()
-        rp.set_url(robots_url)
-        try:
-            rp.read()
-            return rp.can_fetch(self.user_agent, url)
-        except Exception as e:
-            self.logger.warning(f"Error reading robots.txt for {url}: {e}")
-            return True  # Assume allowed if robots.txt can't be fetched
+        if robots_url in self.robots_cache:
+            rp = self.robots_cache[robots_url]
+        else:
+            from urllib.robotparser import RobotFileParser
+
+            rp = RobotFileParser()
+            rp.set_url(robots_url)
+            try:
+                rp.read()
+            except Exception as e:
+                self.logger.warning(f"Error reading robots.txt for {url}: {e}")
+                rp = None  # Assume allowed if robots.txt can't be fetched
+            self.robots_cache[robots_url] = rp
+        return rp.can_fetch(self.user_agent, url) if rp else True
 
     def respect_rate_limit(self, url):
         """
@@ -76,10 +101,94 @@ class WebScraper:
                 time.sleep(self.rate_limit - elapsed_time)
         self.last_request_time[domain] = time.time()
 
+    def normalize_encoding(self, label):
+        """
+        Map a charset label to a Python codec name, or None if it is unknown.
+        """
+        try:
+            name = codecs.lookup(label.strip()).name
+        except LookupError:
+            return None
+        return "cp1252" if name in WINDOWS_1252_ALIASES else name
+
+    def detect_encoding(self, body, content_type=None, sniff_bytes=4096, detect_bytes=65536,
+                        min_evidence=1024):
+        """
+        Determine the encoding of an HTML body without decoding all of it.
+
+        Checks, in order: a byte order mark, the Content-Type charset, a
+        <meta charset> in the first sniff_bytes, and whether the first
+        detect_bytes are valid UTF-8. Statistical detection runs only if all of
+        these fail, only over the first detect_bytes, and only when they hold
+        at least min_evidence non-ASCII bytes. Low-confidence guesses are
+        discarded; the fallback is windows-1252, as browsers do.
+
+        Args:
+            body (bytes): Raw response body.
+            content_type (str): Content-Type header of the response.
+            sniff_bytes (int): Prefix searched for a <meta charset>.
+            detect_bytes (int): Prefix used for UTF-8 validation and detection.
+            min_evidence (int): Non-ASCII bytes needed before trusting a detector.
+
+        Returns:
+            str: Python codec name.
+        """
+        for bom, encoding in BOMS:
+            if body.startswith(bom):
+                return encoding
+
+        if content_type:
+            match = CHARSET_HEADER_RE.search(content_type)
+            encoding = match and self.normalize_encoding(match.group(1))
+            if encoding:
+                return encoding
+
+        match = CHARSET_META_RE.search(body[:sniff_bytes])
+        encoding = match and self.normalize_encoding(match.group(1).decode("ascii", "ignore"))
+        if encoding:
+            return encoding
+
+        prefix = body[:detect_bytes]
+        try:
+            # Incremental decode tolerates a multi-byte character cut off at the prefix end
+            codecs.getincrementaldecoder("utf-8")().decode(prefix, final=len(prefix) == len(body))
+            return "utf-8"
+        except UnicodeDecodeError:
+            pass
+
+        # A few stray accented bytes are too little for a detector to go on
+        non_ascii = len(prefix.translate(None, bytes(range(128))))
+        if non_ascii < min_evidence:
+            return "cp1252"
+
+        encoding = None
+        try:
+            from charset_normalizer import from_bytes
+            best = from_bytes(prefix).best()
+            if best is not None and best.chaos <= MAX_DETECT_CHAOS:
+                encoding = self.normalize_encoding(best.encoding)
+        except ImportError:
+            try:
+                import chardet
+                guess = chardet.detect(prefix)
+                if guess.get("encoding") and (guess.get("confidence") or 0) >= MIN_DETECT_CONFIDENCE:
+                    encoding = self.normalize_encoding(guess["encoding"])
+            except ImportError:
+                pass
+        return encoding or "cp1252"
+
     def fetch_page(self, url):
         """
         Fetch page content with retries and respect rate limits.
+
+        The body is returned undecoded together with its detected encoding,
+        so requests never runs charset detection over the whole page.
+
+        Returns:
+            tuple: (body bytes, encoding), or None if the page could not be fetched.
         """
+        import requests
+
         for attempt in range(self.max_retries):
             try:
                 self.respect_rate_limit(url)
@@ -87,7 +196,8 @@ class WebScraper:
                 response = requests.get(
                     url, headers=headers, timeout=self.timeout)
                 response.raise_for_status()
-                return response.text
+                body = response.content
+                return body, self.detect_encoding(body, response.headers.get("Content-Type"))
             except requests.RequestException as e:
                 self.logger.warning(
                     f"Attempt {attempt + 1}/{self.max_retries}: Error fetching {url}: {e}")
@@ -104,6 +214,8 @@ class WebScraper:
             self.logger.warning("JavaScript rendering is disabled.")
             return None
 
+        from playwright.sync_api import sync_playwright
+
         with sync_playwright() as p:
             browser = p.chromium.launch(headless=True)
             try:
@@ -131,10 +243,19 @@ class WebScraper:
         }
         return metadata
 
-    def extract_content(self, html, url):
+    def extract_content(self, html, url, encoding=None):
         """
         Extract content, links, and metadata from HTML.
+
+        Raw bytes are decoded with their encoding, which is detected cheaply if
+        not given. Invalid bytes are replaced rather than handing the body to
+        the parser's own (strict, full-body) encoding detection.
         """
+        from bs4 import BeautifulSoup
+
+        if isinstance(html, bytes):
+            encoding = encoding or self.detect_encoding(html)
+            html = html.decode(encoding, errors="replace")
         soup = BeautifulSoup(html, "html.parser")
         for element in soup(["script", "style", "nav", "footer", "header"]):
             element.decompose()
@@ -150,16 +271,20 @@ class WebScraper:
         paragraphs = main_content.find_all("p") if main_content else []
         content = " ".join(p.get_text().strip() for p in paragraphs)[:2400]
         links = [urljoin(url, a["href"])
-                 for a in soup.find_all("a", href=True)][:10]
+                 for a in soup.find_all("a", href=True)][:self.max_links]
 
         if self.summarize_content and len(content.split()) > 100:
             content = self.summarize_text(content)
 
-        return {
-            **metadata,
-            "content": content or "No main content found.",
-            "links": list(set(links)),  # Deduplicate links
-        }
+        content = content or "No main content found."
+        return PageContent(
+            title=metadata["title"],
+            description=metadata["description"],
+            keywords=metadata["keywords"],
+            content=content,
+            content_hash=hashlib.sha256(content.encode("utf-8")).hexdigest(),
+            links=list(set(links)),  # Deduplicate links
+        )
 
     def summarize_text(self, text):
         """
@@ -173,14 +298,16 @@ class WebScraper:
         Scrape a single page with content extraction.
         """
         if not self.can_fetch(url):
-            return {"content": "Access denied by robots.txt", "links": [], "title": "No Title"}
+            return PageContent(title="No Title", content="Access denied by robots.txt")
 
-        html = self.fetch_js_page(
-            url) if self.enable_js else self.fetch_page(url)
+        if self.enable_js:
+            html, encoding = self.fetch_js_page(url), None
+        else:
+            html, encoding = self.fetch_page(url) or (None, None)
         if not html:
-            return {"content": f"Failed to fetch {url}", "links": [], "title": "No Title"}
+            return PageContent(title="No Title", content=f"Failed to fetch {url}")
 
-        return self.extract_content(html, url)
+        return self.extract_content(html, url, encoding=encoding)
 
     def scrape_multiple_pages(self, urls):
         """
@@ -202,6 +329,6 @@ if __name__ == "__main__":
     ]
     for url, result in scraper.scrape_multiple_pages(test_urls).items():
         print(f"URL: {url}")
-        print(f"Title: {result['title']}")
-        print(f"Content (first 500 chars): {result['content'][:500]}")
-        print(f"Links: {result['links']}")
+        print(f"Title: {result.title}")
+        print(f"Content (first 500 chars): {result.content[:500]}")
+        print(f"Links: {result.links}")
@@ -1,6 +1,32 @@
 from web_scraper import WebScraper
 
+def check_encoding_fallbacks(scraper):
+    """
+    Bodies that are mislabeled or slightly invalid must still decode sensibly.
+    """
+    html = "<html><body><main><p>Un café au lait</p></main></body></html>"
+
+    # Valid UTF-8 with a single stray byte and a correct header
+    body = html.encode("utf-8").replace(b"lait", b"la\xffit")
+    encoding = scraper.detect_encoding(body, "text/html; charset=utf-8")
+    content = scraper.extract_content(body, "https://example.com", encoding=encoding).content
+    assert "café" in content, content
+
+    # windows-1252 body labeled as UTF-8
+    body = html.encode("cp1252")
+    encoding = scraper.detect_encoding(body, "text/html; charset=utf-8")
+    content = scraper.extract_content(body, "https://example.com", encoding=encoding).content
+    assert "caf" in content and "au lait" in content, content
+
+    # No label at all
+    content = scraper.extract_content(html.encode("cp1252"), "https://example.com").content
+    assert "café" in content, content
+    print("Encoding fallback checks passed.")
+
+
 if __name__ == "__main__":
+    check_encoding_fallbacks(WebScraper())
+
     # Initialize WebScraper with JavaScript rendering enabled
     scraper = WebScraper(enable_js=True)
 